@@ -0,0 +1,79 @@
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import time
+
+import pm4py
+
+# the modules are imported as src.<module>, relative to the repository root
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+import src.objects
+from src.log_to_partial_orders import transform_log_to_partially_ordered_variants
+from src.miner import _mine, mining_cache
+from src.objects import Graph
+
+DEFAULT_LOG = os.path.join(REPOSITORY_ROOT, "test_logs", "interval_event_log_with_LC.xes")
+
+
+def graph_construction_share(partial_orders):
+    """
+    Profiles one mining run and returns (total mining time, time spent constructing Graph objects).
+    """
+    profiler = cProfile.Profile()
+    mining_cache.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        profiler.enable()
+        _mine(partial_orders)
+        profiler.disable()
+
+    stats = pstats.Stats(profiler).stats
+
+    def function_stats(function):
+        code = function.__code__
+        return stats.get((code.co_filename, code.co_firstlineno, code.co_name))
+
+    total_time = function_stats(_mine)[3]
+    construction_time = 0.0
+    trusted_stats = function_stats(Graph.from_trusted.__func__)
+    if trusted_stats:
+        construction_time += trusted_stats[3]
+    init_stats = function_stats(Graph.__init__)
+    if init_stats:
+        # in validation mode, from_trusted delegates to __init__; that time is already counted above
+        construction_time += sum(caller_stats[3] for caller, caller_stats in init_stats[4].items()
+                                 if caller[2] != "from_trusted")
+    return total_time, construction_time
+
+
+def time_mining(partial_orders, repetitions=3):
+    timings = []
+    for _ in range(repetitions):
+        # every repetition mines from scratch, not from the results of the previous one
+        mining_cache.clear()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            _mine(partial_orders)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    log_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    log = pm4py.read_xes(log_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        partial_orders = transform_log_to_partially_ordered_variants(log)
+    print(f"{log_path}: {len(partial_orders)} variants")
+
+    for validate in (True, False):
+        src.objects.VALIDATE_GRAPHS = validate
+        total_time, construction_time = graph_construction_share(partial_orders)
+        mining_time = time_mining(partial_orders)
+        print(f"VALIDATE_GRAPHS={validate}: mining {mining_time:.3f}s; "
+              f"Graph construction {construction_time:.3f}s of {total_time:.3f}s profiled "
+              f"({100 * construction_time / total_time:.1f}%)")
+    src.objects.VALIDATE_GRAPHS = False
@@ -1,24 +1,44 @@
+import numpy as np
+
 from src.objects import Graph
+from src.precedence import PrecedenceSummary
+
+# combine_orders switches to the NumPy backend from this many nodes or orders on
+NUMPY_MIN_NODES = 32
+NUMPY_MIN_ORDERS = 64
+
+
+def combine_orders(orders, summary: PrecedenceSummary = None):
+    """
+    Args:
+        orders: The partial orders to combine.
+        summary: Optional PrecedenceSummary of the same orders (e.g., shared with other passes of _mine); it is
+            used by the NumPy backend instead of building a new one.
+    """
+    nodes = summary.nodes if summary is not None else sorted({x for g in orders for x in g.nodes})
+    if len(nodes) >= NUMPY_MIN_NODES or len(orders) >= NUMPY_MIN_ORDERS:
+        return _combine_orders_numpy(summary if summary is not None else PrecedenceSummary(orders))
+    return _combine_orders_bitsets(orders, nodes)
 
 
-def combine_orders(orders):
-    nodes = sorted({x for g in orders for x in g.nodes})
+def _combine_orders_bitsets(orders, nodes):
     idx   = {x:i for i,x in enumerate(nodes)}
     n     = len(nodes)
 
     edges_bits     = [0] * n
     conflicts_bits = [0] * n
     for g in orders:
+        # every pair of nodes of g that is not an edge of g is a conflict (including each node with itself)
+        out_bits = {u: 0 for u in g.nodes}
+        for u, v in g.edges:
+            out_bits[u] |= (1 << idx[v])
+        nodes_bits = 0
         for u in g.nodes:
+            nodes_bits |= (1 << idx[u])
+        for u, eb in out_bits.items():
             ui = idx[u]
-            for v in g.nodes:
-                vi = idx[v]
-                if u == v:
-                    conflicts_bits[ui] |= (1 << vi)
-                if (u, v) in g.edges:
-                    edges_bits[ui] |= (1 << vi)
-                else:
-                    conflicts_bits[ui] |= (1 << vi)
+            edges_bits[ui] |= eb
+            conflicts_bits[ui] |= (nodes_bits & ~eb) | (1 << ui)
 
 
     # Transitive closure with Floyd–Warshall algorithm
@@ -65,4 +85,35 @@ def combine_orders(orders):
         if (edges_bits[i] >> j) & 1
     }
 
-    return Graph(frozenset(nodes), frozenset(final))
\ No newline at end of file
+    return Graph.from_trusted(frozenset(nodes), frozenset(final), partial_order=True)
+
+
+def _combine_orders_numpy(summary):
+    """
+    Same algorithm as _combine_orders_bitsets, on the boolean matrices of a PrecedenceSummary: a pair (u, v) is a
+    conflict iff u and v occur together in an order without the edge (u, v).
+    The closure and the pruning run as row-wise vectorized operations.
+    """
+    nodes = summary.nodes
+    n = len(nodes)
+
+    edges = summary.sometimes_before()
+    conflicts = summary.conflicts()
+
+    # Transitive closure with Floyd–Warshall algorithm
+    for k in range(n):
+        edges[edges[:, k]] |= edges[k]
+
+    # remove any direct conflict edges (they may have been added via closure)
+    edges &= ~conflicts
+
+    # for each conflict (i→k), remove every j→k where i→j; row i itself cannot change while it is processed
+    for i in range(n):
+        mids = np.flatnonzero(edges[i])
+        if len(mids):
+            edges[np.ix_(mids, conflicts[i])] = False
+
+    sources, targets = np.nonzero(edges)
+    final = {(nodes[i], nodes[j]) for i, j in zip(sources.tolist(), targets.tolist())}
+
+    return Graph.from_trusted(frozenset(nodes), frozenset(final), partial_order=True)
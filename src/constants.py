@@ -1,3 +1,8 @@
 TURBO = True
 LOOP_MINING = True
-XOR_MINING = True
\ No newline at end of file
+XOR_MINING = True
+# maximum number of sub-logs memoized by miner._mine (0 disables the cache)
+MINING_CACHE_SIZE = 4096
+# loop mining strategy applied to every variant with repeated activities before skip mining: a name registered in
+# src.loop_strategies ("instances", "start_end"), "auto" for the cheapest estimated one, or None to disable
+LOOP_STRATEGY = None
@@ -14,6 +14,8 @@ from typing import Optional, Dict, Any
 from pm4py.objects.powl.obj import POWL, Transition, SilentTransition, StrictPartialOrder, OperatorPOWL, \
     FrequentTransition
 
+from src.reachability import transitive_reduction
+
 OPERATOR_BOXES = True
 FREQUENCY_TAG_IMAGES = True
 
@@ -23,6 +25,20 @@ fillcolor = "#fcfcfc"
 opacity_change_ratio = 0.02
 
 
+def transitive_reduction_of_order(powl: StrictPartialOrder):
+    """
+    Returns the edges of the transitive reduction of the order of a StrictPartialOrder, as (i, j) positions in
+    powl.children.
+    """
+    order = powl.order
+    children = powl.children
+    if not order.is_irreflexive():
+        raise ValueError("Cannot generate transitive reduction! Reflexivity detected!")
+    edges = [(i, j) for i, child in enumerate(children) for j, child2 in enumerate(children)
+             if order.is_edge(child, child2)]
+    return sorted(transitive_reduction(range(len(children)), edges))
+
+
 class Parameters(Enum):
     FORMAT = "format"
     COLOR_MAP = "color_map"
@@ -179,7 +195,8 @@ def repr_powl(powl, viz, color_map, level, skip_order=False, loop_order=False, b
                      fillcolor=current_color)
 
     elif isinstance(powl, StrictPartialOrder):
-        transitive_reduction = powl.order.get_transitive_reduction()
+        children = powl.children
+        transitive_reduction = transitive_reduction_of_order(powl)
         if not block_id:
             block_id = get_id(powl)
         with viz.subgraph(name=block_id) as block:
@@ -214,10 +231,8 @@ def repr_powl(powl, viz, color_map, level, skip_order=False, loop_order=False, b
 
             for child in powl.children:
                 repr_powl(child, block, color_map, level=level + 1)
-            for child in powl.children:
-                for child2 in powl.children:
-                    if transitive_reduction.is_edge(child, child2):
-                        add_order_edge(block, child, child2)
+            for i, j in transitive_reduction:
+                add_order_edge(block, children[i], children[j])
 
     elif isinstance(powl, OperatorPOWL):
         block_id = get_id(powl)
@@ -0,0 +1,124 @@
+import gzip
+import os
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Dict, Any
+
+import pandas as pd
+
+from src.log_to_partial_orders import DEFAULT_TIMESTAMP_KEY
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def read_log_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, timestamp_col: str or None = DEFAULT_TIMESTAMP_KEY,
+                    **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Reads an event log from a .csv, .parquet, .xes or .xes.gz file as an iterator of DataFrames with roughly
+    chunk_size events each. The file is never loaded as a whole.
+
+    The events of a case are expected to be contiguous in CSV and Parquet files (XES files are case-contiguous by
+    construction), as required by transform_chunks_to_partially_ordered_variants.
+    """
+    lower_path = path.lower()
+    if lower_path.endswith(".csv") or lower_path.endswith(".csv.gz"):
+        return read_csv_chunks(path, chunk_size, timestamp_col, **kwargs)
+    elif lower_path.endswith(".parquet"):
+        return read_parquet_chunks(path, chunk_size, timestamp_col, **kwargs)
+    elif lower_path.endswith(".xes") or lower_path.endswith(".xes.gz"):
+        return read_xes_chunks(path, chunk_size)
+    else:
+        raise ValueError(f"Unsupported log format: {os.path.basename(path)}")
+
+
+def read_csv_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, timestamp_col: str or None = DEFAULT_TIMESTAMP_KEY,
+                    **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, chunksize=chunk_size, **read_csv_kwargs) as reader:
+        for chunk in reader:
+            yield _parse_timestamps(chunk, timestamp_col)
+
+
+def read_parquet_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        timestamp_col: str or None = DEFAULT_TIMESTAMP_KEY, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yield _parse_timestamps(batch.to_pandas(), timestamp_col)
+
+
+def read_xes_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Incrementally parses an XES file, yielding a DataFrame (in the pm4py column format, i.e., trace attributes are
+    prefixed with 'case:') whenever at least chunk_size events of complete traces are buffered.
+    Nested (list/container) attributes are ignored.
+    """
+    opener = gzip.open if path.lower().endswith(".gz") else open
+
+    rows: List[Dict[str, Any]] = []
+    date_columns = set()
+    trace_attributes: Dict[str, Any] = {}
+    trace_events: List[Dict[str, Any]] = []
+    stack = []
+    root = None
+
+    with opener(path, "rb") as xes_file:
+        for event, elem in ET.iterparse(xes_file, events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                if root is None:
+                    root = elem
+                stack.append(tag)
+                if tag == "trace":
+                    trace_attributes = {}
+                    trace_events = []
+                elif tag == "event" and len(stack) >= 2 and stack[-2] == "trace":
+                    trace_events.append({})
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+            if tag in _XES_VALUE_PARSERS and parent in ("event", "trace"):
+                key = elem.get("key")
+                value = _XES_VALUE_PARSERS[tag](elem.get("value"))
+                if parent == "event" and stack[-2:-1] == ["trace"]:
+                    trace_events[-1][key] = value
+                    if tag == "date":
+                        date_columns.add(key)
+                elif parent == "trace":
+                    trace_attributes["case:" + key] = value
+                    if tag == "date":
+                        date_columns.add("case:" + key)
+            elif tag == "trace":
+                for event_attributes in trace_events:
+                    rows.append({**event_attributes, **trace_attributes})
+                root.clear()
+                if len(rows) >= chunk_size:
+                    yield _to_dataframe(rows, date_columns)
+                    rows = []
+
+    if rows:
+        yield _to_dataframe(rows, date_columns)
+
+
+def _to_dataframe(rows, date_columns):
+    chunk = pd.DataFrame(rows)
+    for column in date_columns:
+        if column in chunk.columns:
+            chunk[column] = pd.to_datetime(chunk[column], utc=True, format="ISO8601")
+    return chunk
+
+
+def _parse_timestamps(chunk: pd.DataFrame, timestamp_col: str or None):
+    if timestamp_col and timestamp_col in chunk.columns and not pd.api.types.is_datetime64_any_dtype(chunk[timestamp_col]):
+        chunk[timestamp_col] = pd.to_datetime(chunk[timestamp_col], utc=True, format="ISO8601")
+    return chunk
+
+
+_XES_VALUE_PARSERS = {
+    "string": str,
+    "id": str,
+    "date": str,
+    "int": int,
+    "float": float,
+    "boolean": lambda value: value.lower() == "true",
+}
@@ -1,8 +1,13 @@
-from collections import deque, defaultdict
-from typing import List, Dict, Tuple, Any
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Iterable
+import numpy as np
 import pandas as pd
 
-from src.objects import VARIANT_FREQUENCY_KEY, ActivityInstance, Graph
+from src import variant_cache
+from src.objects import VARIANT_FREQUENCY_KEY, ActivityInstance
+from src.variant_encoding import ActivityAlphabet, CompactVariant, CompactVariantLog
 
 DEFAULT_CASE_ID_KEY = 'case:concept:name'
 DEFAULT_ACTIVITY_KEY = 'concept:name'
@@ -25,71 +30,154 @@ def generate_interval_df_fifo(
     #         work_df[timestamp_col] = work_df[timestamp_col].dt.tz_convert('UTC')
     # except Exception as e:
     #     raise ValueError(f"Failed to convert timestamp column '{timestamp_col}': {e}")
+    work_df = work_df[work_df[case_id_col].notna()]
+    work_df = work_df.sort_values([case_id_col, ordering_col]).reset_index(drop=True)
+    ordering = work_df[ordering_col]
+
     if lifecycle_col:
-        work_df[lifecycle_col] = work_df[lifecycle_col].str.lower()
-    work_df = work_df.sort_values([case_id_col, ordering_col])
-    interval_list = []
-    for case_id, trace_df in work_df.groupby(case_id_col, sort=False):
-        activities_start: Dict[Tuple, deque] = {}
-        activities_ids: Dict[str, int] = {}
-        for index, event in trace_df.iterrows():
-            activity = event[activity_col]
-            instance = event[lifecycle_instance_col] if lifecycle_instance_col else None
-            activity_key = (activity, instance)
-            timestamp = event[ordering_col]
-            if lifecycle_col:
-                transition = event[lifecycle_col]
-                if transition == start_transition.lower():
-                    if activity_key not in activities_start:
-                        activities_start[activity_key] = deque()
-                    activities_start[activity_key].append({'timestamp': timestamp, 'event_index': index})
-                elif transition == complete_transition.lower():
-                    start_timestamp = timestamp
-                    if activity_key in activities_start and activities_start[activity_key]:
-                        start_timestamp = activities_start[activity_key].popleft()['timestamp']
-                    if activity not in activities_ids:
-                        activities_ids[activity] = 1
-                    else:
-                        activities_ids[activity] = activities_ids[activity] + 1
-                    activity_instance = ActivityInstance(activity, activities_ids[activity])
-                    interval_record = { case_id_col: case_id, 'activity': activity_instance, 'start_timestamp': start_timestamp, 'end_timestamp': timestamp, **( {lifecycle_instance_col: instance} if lifecycle_instance_col else {} ) }
-                    interval_list.append(interval_record)
-            else:
-                if activity not in activities_ids:
-                    activities_ids[activity] = 1
-                else:
-                    activities_ids[activity] = activities_ids[activity] + 1
-                activity_instance = ActivityInstance(activity, activities_ids[activity])
-                interval_record = {case_id_col: case_id, 'activity': activity_instance,
-                                   'start_timestamp': timestamp, 'end_timestamp': timestamp,
-                                   **({lifecycle_instance_col: instance} if lifecycle_instance_col else {})}
-                interval_list.append(interval_record)
-    if not interval_list:
+        transitions = work_df[lifecycle_col].str.lower()
+        is_start = (transitions == start_transition.lower()).to_numpy()
+        is_complete = (transitions == complete_transition.lower()).to_numpy()
+
+        # FIFO matching is done per (case, activity, instance) key. Every key gets an integer id and every
+        # start event a 1-based rank inside its key, in order of occurrence.
+        key_cols = [case_id_col, activity_col] + ([lifecycle_instance_col] if lifecycle_instance_col else [])
+        key_ids = work_df.groupby(key_cols, sort=False, dropna=False).ngroup().to_numpy()
+        starts_seen = pd.Series(is_start.astype(np.int64)).groupby(key_ids).cumsum().to_numpy()
+
+        # For the j-th complete event of a key, let s_j be the number of starts seen so far. The queue is
+        # non-empty iff s_j > m_{j-1}, where m_j = min(s_j, m_{j-1} + 1) is the number of starts consumed
+        # after j completes. Unrolling the recurrence gives m_j = j + min(0, min_{i<=j}(s_i - i)).
+        interval_idx = np.flatnonzero(is_complete)
+        complete_keys = key_ids[interval_idx]
+        complete_rank = pd.Series(np.ones(len(interval_idx), dtype=np.int64)).groupby(complete_keys).cumsum().to_numpy()
+        slack = pd.Series(starts_seen[interval_idx] - complete_rank).groupby(complete_keys).cummin().to_numpy()
+        consumed = complete_rank + np.minimum(slack, 0)
+        previously_consumed = pd.Series(consumed).groupby(complete_keys).shift(1, fill_value=0).to_numpy()
+        matched = consumed > previously_consumed
+
+        # Sort-based lookup of the consumed start: starts are ordered by key (stable, so by rank inside a key),
+        # hence the m-th start of key k sits at offset(k) + m - 1.
+        start_idx = np.flatnonzero(is_start)
+        start_order = start_idx[np.argsort(key_ids[start_idx], kind='stable')]
+        start_offsets = np.searchsorted(key_ids[start_order], complete_keys[matched])
+        start_positions = interval_idx.copy()
+        start_positions[matched] = start_order[start_offsets + consumed[matched] - 1]
+    else:
+        interval_idx = np.arange(len(work_df))
+        start_positions = interval_idx
+
+    if len(interval_idx) == 0:
         return pd.DataFrame()
-    interval_df = pd.DataFrame(interval_list)
-    interval_df['start_timestamp'] = pd.to_datetime(interval_df['start_timestamp'], utc=True)
-    interval_df['end_timestamp'] = pd.to_datetime(interval_df['end_timestamp'], utc=True)
+
+    interval_df = work_df.iloc[interval_idx][[case_id_col, activity_col] + ([lifecycle_instance_col] if lifecycle_instance_col else [])].reset_index(drop=True)
+    interval_df['start_timestamp'] = pd.to_datetime(ordering.take(start_positions).reset_index(drop=True), utc=True)
+    interval_df['end_timestamp'] = pd.to_datetime(ordering.take(interval_idx).reset_index(drop=True), utc=True)
+    # instance numbers count the intervals of an activity inside a case, in order of completion
+    instance_numbers = interval_df.groupby([case_id_col, activity_col], sort=False, dropna=False).cumcount().to_numpy() + 1
+    interval_df['activity'] = [ActivityInstance(label, int(number)) for label, number in zip(interval_df[activity_col], instance_numbers)]
+    interval_df = interval_df[[case_id_col, 'activity', 'start_timestamp', 'end_timestamp'] + ([lifecycle_instance_col] if lifecycle_instance_col else [])]
+
     interval_df = interval_df.sort_values([case_id_col, 'start_timestamp', 'end_timestamp']).reset_index(drop=True)
     interval_df['event_instance_id'] = interval_df.index
     print(f"Successfully created {len(interval_df)} activity intervals using FIFO logic.")
     return interval_df
 
 
+def derive_case_variants(interval_df: pd.DataFrame, case_id_col: str, node_ids: np.ndarray):
+    """
+    Streams the compact variant of every case of an interval DataFrame (as produced by generate_interval_df_fifo,
+    i.e., sorted by case and start timestamp).
+
+    An interval a precedes an interval b iff b starts strictly after a ends. Since the intervals of a case are
+    sorted by start, the successors of a form a suffix [first[a], n) of the case, which is found with a binary search
+    on the start timestamps. A successor b of a is implied by transitivity iff it also succeeds some successor c of
+    a, i.e., iff b >= min(first[c] for c >= first[a]); so the Hasse diagram edges of a go to the range
+    [first[a], suffix_min[first[a]]), and neither the precedence matrix nor the closure of a case is built.
+
+    Args:
+        node_ids (np.ndarray): The interned node id of every row of interval_df.
+
+    Yields:
+        (case_id, CompactVariant) per case.
+    """
+    case_ids = interval_df[case_id_col].to_numpy()
+    starts = interval_df['start_timestamp'].values
+    ends = interval_df['end_timestamp'].values
+
+    boundaries = np.flatnonzero(case_ids[1:] != case_ids[:-1]) + 1
+    case_starts = np.concatenate(([0], boundaries))
+    case_ends = np.concatenate((boundaries, [len(case_ids)]))
+
+    for lo, hi in zip(case_starts.tolist(), case_ends.tolist()):
+        first_successors = np.searchsorted(starts[lo:hi], ends[lo:hi], side='right')
+        suffix_min = np.minimum.accumulate(np.append(first_successors, hi - lo)[::-1])[::-1]
+        counts = suffix_min[first_successors] - first_successors
+        sources = np.repeat(np.arange(hi - lo), counts)
+        offsets = np.cumsum(counts) - counts
+        targets = np.arange(counts.sum()) - np.repeat(offsets - first_successors, counts)
+        yield case_ids[lo], CompactVariant.from_hasse(node_ids[lo:hi], sources, targets)
+
+
 def transform_log_to_partially_ordered_variants(
-    df: pd.DataFrame,
+    df: pd.DataFrame or str,
     case_id_col: str = DEFAULT_CASE_ID_KEY,
     activity_col: str = DEFAULT_ACTIVITY_KEY,
     ordering_col: str = DEFAULT_TIMESTAMP_KEY,
     lifecycle_col: str or None = DEFAULT_LIFECYCLE_KEY,
     start_transition: str = "start",
     complete_transition: str = "complete",
-    lifecycle_instance_col: str = DEFAULT_LIFECYCLE_INSTANCE_KEY
-) -> List[Any]:
+    lifecycle_instance_col: str = DEFAULT_LIFECYCLE_INSTANCE_KEY,
+    n_jobs: int = 1,
+    compact: bool = False,
+    cache_dir: str = None
+) -> List[Any] or CompactVariantLog:
     """
+    Args:
+        df: The event log, or the path of a .csv, .parquet, .xes or .xes.gz file (read with
+            src.log_readers.read_log_chunks, and only on a cache miss if cache_dir is set).
+        n_jobs: Number of worker processes used to group the cases into variants: -1 uses all CPUs, any other value
+            must be at least 1 (ValueError otherwise).
+            The cases are partitioned into contiguous ranges, and the partial variant counts of the workers are
+            merged in partition order, so the result is identical to the sequential one.
+        compact: If True, the variants are returned as a CompactVariantLog and no Graph is built. Otherwise every
+            variant becomes a Graph with the full (transitively closed) precedence relation.
+        cache_dir: If set, the variants are cached on disk in this directory (see src.variant_cache), keyed by the
+            hash of the source file (or of the used columns of an in-memory log) and the column and lifecycle
+            parameters. On a hit, the log is neither read nor processed. Logs with activity labels of other types
+            than str, int, float, bool and None are not cached.
+
     Returns:
         List of variant summaries (dict) or StrictPartialOrder objects,
         sorted by frequency descending.
     """
+    if n_jobs != -1 and n_jobs < 1:
+        raise ValueError(f"n_jobs must be -1 (all CPUs) or a positive number of processes, got {n_jobs}.")
+
+    params = dict(case_id_col=case_id_col, activity_col=activity_col, ordering_col=ordering_col,
+                  lifecycle_col=lifecycle_col, start_transition=start_transition,
+                  complete_transition=complete_transition, lifecycle_instance_col=lifecycle_instance_col)
+
+    entry = None
+    if cache_dir is not None:
+        if isinstance(df, (str, os.PathLike)):
+            fingerprint = variant_cache.file_fingerprint(df)
+        elif isinstance(df, pd.DataFrame):
+            fingerprint = variant_cache.dataframe_fingerprint(
+                df, [case_id_col, activity_col, ordering_col, lifecycle_col, lifecycle_instance_col])
+        else:
+            raise TypeError("Input 'log' must be a Pandas DataFrame or a file path.")
+        entry = os.path.join(cache_dir, variant_cache.cache_key(fingerprint, params))
+        if os.path.isdir(entry):
+            print(f"Loading variants from cache {entry}...")
+            variant_log = variant_cache.load_variant_log(entry)
+            print(f"Found {len(variant_log)} unique variants.")
+            return variant_log if compact else variant_log.to_partial_orders()
+
+    if isinstance(df, (str, os.PathLike)):
+        from src.log_readers import read_log_chunks
+        df = pd.concat(list(read_log_chunks(os.fspath(df), timestamp_col=ordering_col)), ignore_index=True)
+
     if not isinstance(df, pd.DataFrame):
         raise TypeError("Input 'log' must be a Pandas DataFrame.")
 
@@ -102,63 +190,160 @@ def transform_log_to_partially_ordered_variants(
     if interval_df.empty:
         raise Exception("Interval DataFrame is empty, no variants to generate.")
 
-    # Pre-calculate All Potential Edges
-    print("Calculating potential direct succession edges...")
-    merged_df = pd.merge(
-        interval_df[[case_id_col, 'activity', 'start_timestamp', 'end_timestamp', 'event_instance_id']],
-        interval_df[[case_id_col, 'activity', 'start_timestamp', 'end_timestamp', 'event_instance_id']],
-        on=case_id_col,
-        suffixes=('_1', '_2')
-    )
-    merged_df = merged_df[merged_df['event_instance_id_1'] != merged_df['event_instance_id_2']]
-    is_directly_followed = merged_df['start_timestamp_2'] > merged_df['end_timestamp_1']
-    # Store edges with activity labels AND the case_id they belong to
-    direct_follows_edges_df = merged_df.loc[is_directly_followed, [case_id_col, 'activity_1', 'activity_2']].copy()
-    print(f"Identified {len(direct_follows_edges_df)} total edge candidates.")
+    # Calculate Canonical Key per Trace and Group ---
+    print("Deriving precedence relations and grouping traces by canonical variant key...")
+    alphabet = ActivityAlphabet()
+    node_ids = alphabet.intern_all(interval_df['activity'])
+    variants_data = defaultdict(int)
+    total_cases = interval_df[case_id_col].nunique()
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, total_cases)
+    if n_jobs > 1:
+        print(f"Grouping {total_cases} cases using {n_jobs} processes...")
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            partitions = split_by_cases(interval_df[[case_id_col, 'start_timestamp', 'end_timestamp']], case_id_col, n_jobs)
+            node_id_partitions = np.split(node_ids, np.cumsum([len(partition) for partition in partitions])[:-1])
+            partial_counts = executor.map(count_variants, partitions, [case_id_col] * len(partitions), node_id_partitions)
+            for counts in partial_counts:
+                for variant_key, frequency in counts.items():
+                    variants_data[variant_key] += frequency
+    else:
+        add_cases_to_variants(variants_data, interval_df, case_id_col, node_ids, total_cases)
+    print(f"Found {len(variants_data)} unique variants.")
 
-    # Group edges by case for quick lookup later
-    edges_by_case = direct_follows_edges_df.groupby(case_id_col)[['activity_1', 'activity_2']].apply(
-        lambda g: tuple(sorted(zip(g['activity_1'], g['activity_2'])))  # Create sorted tuple of edge pairs
-    ).to_dict()  # Convert to dictionary {case_id: tuple_of_edges}
+    variant_log = CompactVariantLog(alphabet, dict(variants_data))
+    if entry is not None:
+        if variant_cache.supports_labels(alphabet.labels):
+            variant_cache.save_variant_log(variant_log, entry)
+            print(f"Saved variants to cache {entry}.")
+        else:
+            print("Not caching the variants: some activity labels are not str, int, float, bool or None.")
+    return variant_log if compact else variant_log.to_partial_orders()
 
-    # Calculate Canonical Key per Trace and Group ---
-    print("Grouping traces by canonical variant key...")
-    variants_data = defaultdict(lambda: {VARIANT_FREQUENCY_KEY: 0})
 
-    grouped_intervals = interval_df.groupby(case_id_col)
-    total_cases = len(grouped_intervals)
+def transform_chunks_to_partially_ordered_variants(
+    chunks: Iterable[pd.DataFrame],
+    case_id_col: str = DEFAULT_CASE_ID_KEY,
+    activity_col: str = DEFAULT_ACTIVITY_KEY,
+    ordering_col: str = DEFAULT_TIMESTAMP_KEY,
+    lifecycle_col: str or None = DEFAULT_LIFECYCLE_KEY,
+    start_transition: str = "start",
+    complete_transition: str = "complete",
+    lifecycle_instance_col: str = DEFAULT_LIFECYCLE_INSTANCE_KEY,
+    compact: bool = False,
+    validate_contiguity: bool = False
+) -> List[Any] or CompactVariantLog:
+    """
+    Streaming counterpart of transform_log_to_partially_ordered_variants.
+
+    The events of a case must be contiguous in the stream, but a case may be split across consecutive chunks. Every
+    case is folded into the variant dictionary as soon as it is known to be complete, so only the current chunk and
+    the distinct variants are kept in memory. The variants are returned in the same order as by
+    transform_log_to_partially_ordered_variants (by frequency, ties by the smallest case id of the variant).
+
+    Args:
+        chunks: An iterable of DataFrames, e.g., from src.log_readers.read_log_chunks.
+        compact: If True, the variants are returned as a CompactVariantLog and no Graph is built. Otherwise every
+            variant becomes a Graph with the full (transitively closed) precedence relation.
+        validate_contiguity: If True, a case that reappears after it was completed raises a ValueError. This keeps
+            the ids of all completed cases in memory, so memory grows with the number of cases. If False, such a
+            case is counted as a separate case.
+
+    Returns:
+        List of Graph objects, sorted by frequency descending.
+    """
+    alphabet = ActivityAlphabet()
+    variants_data = defaultdict(int)
+    first_cases = {}
+    finished_cases = set()
+    interval_params = (case_id_col, activity_col, ordering_col, lifecycle_col,
+                       start_transition, complete_transition, lifecycle_instance_col)
+
+    def add_finished_cases(finished_df):
+        if validate_contiguity:
+            case_ids = set(finished_df[case_id_col].dropna())
+            reappearing = case_ids & finished_cases
+            if reappearing:
+                raise ValueError(f"The events of case {min(reappearing)} are not contiguous in the stream.")
+            finished_cases.update(case_ids)
+        interval_df = generate_interval_df_fifo(finished_df, *interval_params)
+        if interval_df.empty:
+            return 0
+        node_ids = alphabet.intern_all(interval_df['activity'])
+        return add_cases_to_variants(variants_data, interval_df, case_id_col, node_ids, first_cases=first_cases)
+
     processed_cases = 0
+    pending = None
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        # the last case of a chunk may continue in the next one
+        is_last_case = (chunk[case_id_col] == chunk[case_id_col].iloc[-1]).to_numpy()
+        pending = chunk[is_last_case]
+        finished_df = chunk[~is_last_case]
+        if not finished_df.empty:
+            processed_cases += add_finished_cases(finished_df)
+            print(f"Processed {processed_cases} cases, {len(variants_data)} unique variants so far...")
 
-    for case_id, trace_df in grouped_intervals:
-        trace_activities_multiset = frozenset(trace_df['activity'].tolist())
+    if pending is not None:
+        processed_cases += add_finished_cases(pending)
 
-        trace_edges = frozenset(edges_by_case.get(case_id, tuple()))
+    if not variants_data:
+        raise Exception("Interval DataFrame is empty, no variants to generate.")
+    print(f"Found {len(variants_data)} unique variants in {processed_cases} cases.")
 
-        # Canonical Variant Key
-        variant_key = (trace_activities_multiset, trace_edges)
+    # the batch path visits the cases sorted by id, i.e., every variant first appears with its smallest case id
+    variants_data = {variant: variants_data[variant] for variant in sorted(variants_data, key=first_cases.__getitem__)}
+    variant_log = CompactVariantLog(alphabet, variants_data)
+    return variant_log if compact else variant_log.to_partial_orders()
 
-        # Update dictionary
-        variants_data[variant_key][VARIANT_FREQUENCY_KEY] += 1
-        if 'structure' not in variants_data[variant_key]:
-            variants_data[variant_key]['structure'] = {'activities': trace_activities_multiset, 'edges': trace_edges}
+
+def add_cases_to_variants(variants_data, interval_df: pd.DataFrame, case_id_col: str, node_ids: np.ndarray,
+                          total_cases: int = None, first_cases: dict = None) -> int:
+    """
+    Folds every case of an interval DataFrame into variants_data, a {CompactVariant: frequency} dictionary.
+
+    Args:
+        first_cases: If given, updated to map every variant to the smallest id of its cases.
+
+    Returns:
+        The number of processed cases.
+    """
+    processed_cases = 0
+
+    for case_id, variant_key in derive_case_variants(interval_df, case_id_col, node_ids):
+        variants_data[variant_key] += 1
+        if first_cases is not None and (variant_key not in first_cases or case_id < first_cases[variant_key]):
+            first_cases[variant_key] = case_id
 
         processed_cases += 1
-        if processed_cases % 1000 == 0:
+        if total_cases and processed_cases % 1000 == 0:
             print(f"Processed {processed_cases}/{total_cases} cases for grouping...")
 
-    print(f"Found {len(variants_data)} unique variants.")
+    return processed_cases
+
 
-    # Format Output ---
-    output_list = []
-    for variant_key, data in variants_data.items():
-        add_info = {
-            VARIANT_FREQUENCY_KEY: data[VARIANT_FREQUENCY_KEY],
-        }
-        order = Graph(variant_key[0], variant_key[1], add_info)
-        output_list.append(order)
+def split_by_cases(interval_df: pd.DataFrame, case_id_col: str, n_parts: int) -> List[pd.DataFrame]:
+    """
+    Splits a case-sorted interval DataFrame into at most n_parts contiguous partitions of roughly equal size,
+    without splitting any case.
+    """
+    case_ids = interval_df[case_id_col].to_numpy()
+    boundaries = np.flatnonzero(case_ids[1:] != case_ids[:-1]) + 1
+    targets = np.arange(1, n_parts) * len(case_ids) // n_parts
+    cuts = np.unique(boundaries[np.minimum(np.searchsorted(boundaries, targets), len(boundaries) - 1)]) if len(boundaries) else []
+    limits = [0] + list(cuts) + [len(case_ids)]
+    return [interval_df.iloc[lo:hi] for lo, hi in zip(limits[:-1], limits[1:])]
 
-    output_list.sort(
-        key=lambda x: x.additional_information[VARIANT_FREQUENCY_KEY],
-        reverse=True)
 
-    return output_list
+def count_variants(interval_df: pd.DataFrame, case_id_col: str, node_ids: np.ndarray):
+    """
+    Worker of the parallel variant extraction: returns the partial {variant_key: frequency} map of the cases in
+    interval_df.
+    """
+    variants_data = defaultdict(int)
+    add_cases_to_variants(variants_data, interval_df, case_id_col, node_ids)
+    return dict(variants_data)
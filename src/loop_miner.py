@@ -1,6 +1,9 @@
-from collections import defaultdict, deque
+from collections import defaultdict
 
 from src.combine_order import combine_orders
+from src.mapping import quotient_edges
+from src.reachability import popcount
+from src.union_find import UnionFind
 from src.objects import LOOP, ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
 
 
@@ -9,6 +12,17 @@ LOOP_THRESHOLD = 0.9
 
 
 class LoopMiner:
+    @staticmethod
+    def loop_signature(do_part):
+        """
+        Canonical label-level signature of a loop body: the label for a single activity; the label set and the set
+        of label pairs of the edges for a graph.
+        """
+        if isinstance(do_part, ActivityInstance):
+            return do_part.label
+        return (frozenset(n.label for n in do_part.nodes),
+                frozenset((s.label, t.label) for (s, t) in do_part.edges))
+
     @classmethod
     def find_loops(cls, graph: Graph):
         # 1) Collect all ActivityInstance nodes by label
@@ -17,28 +31,18 @@ class LoopMiner:
             if isinstance(node, ActivityInstance) and node.label:
                 label_to_instances[node.label].append(node)
 
-        # 2) Build adjacency for reachability
-        succ = defaultdict(set)
-        pred = defaultdict(set)
-        for s, t in graph.edges:
-            succ[s].add(t)
-            pred[t].add(s)
+        # 2) Reachability as bitsets over graph.node_order
+        node_index = graph.node_index
+        descendants = graph.descendant_bits
+        ancestors = graph.ancestor_bits
 
         # 3) Calculate number of predecessors ("distance to start") for each label
         label_predecessors_count = {}
         for label, insts in label_to_instances.items():
-            all_preds = set()
+            all_preds = 0
             for inst in insts:
-                dq = deque([inst])
-                visited = set()
-                while dq:
-                    u = dq.popleft()
-                    for p in pred[u]:
-                        if p not in visited:
-                            visited.add(p)
-                            dq.append(p)
-                all_preds.update(visited)
-            label_predecessors_count[label] = len(all_preds)
+                all_preds |= ancestors[node_index[inst]]
+            label_predecessors_count[label] = popcount(all_preds)
         #
         # # 4) Sort labels by predecessor count (closer to start first)
         ordered_labels = sorted(label_to_instances.keys(), key=lambda l: label_predecessors_count[l], reverse=True)
@@ -46,7 +50,7 @@ class LoopMiner:
 
         mapping = {}
         processed_nodes = set()
-        loops = set()
+        loops_by_signature = {}
         loops_frequencies = defaultdict(int)
         loop_groups = []
         label_group_to_loop_map = defaultdict(set)
@@ -62,207 +66,74 @@ class LoopMiner:
             insts_sorted = sorted(insts, key=lambda x: x.number)
 
             for i in range(len(insts) - 1):
-
-                # sort instances
-
                 first, last = insts_sorted[i], insts_sorted[i+1]
+                if first in processed_nodes:
+                    continue
 
-                if MULTIPLE_LOOPS or True:
-                    if first in processed_nodes:
-                        continue
-
-                # reachable from first
-                reach = set()
-                dq = deque([first])
-                while dq:
-                    u = dq.popleft()
-                    for v in succ[u]:
-                        if v not in reach:
-                            reach.add(v)
-                            dq.append(v)
-
-                # ancestors of last
-                anc = set()
-                dq = deque([last])
-                while dq:
-                    u = dq.popleft()
-                    for p in pred[u]:
-                        if p not in anc:
-                            anc.add(p)
-                            dq.append(p)
-
-                # do-set = intersection + include the boundary instances
-                do_set = (reach & anc) | {first}
+                # do-set = (reachable from first and ancestors of last) + include the boundary instances
+                inbetween = descendants[node_index[first]] & ancestors[node_index[last]]
+                do_set = graph.nodes_from_bits(inbetween) | {first}
 
                 new_label_group = {n.label for n in do_set}
                 loop_groups.append(new_label_group)
 
-                if MULTIPLE_LOOPS or True:
-
-                    new_nodes_map = {}
-                    label_counter = defaultdict(int)
-                    for n in do_set:
-                        label_counter[n.label] += 1
-                        new_nodes_map[n] = ActivityInstance(n.label, label_counter[n.label])
-
-                    if len(do_set) == 1 and False:
-                        do_part = new_nodes_map[list(do_set)[0]]
-                    else:
-                        new_edges = {(new_nodes_map[s], new_nodes_map[t]) for (s, t) in graph.edges if
-                                     s in do_set and t in do_set}
-                        do_part = Graph(
-                            nodes=frozenset(new_nodes_map.values()),
-                            edges=frozenset(new_edges),
-                            # additional_information={VARIANT_FREQUENCY_KEY:
-                            #                             graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
-                        )
-                    loop_node = LOOP(body=do_part, redo=ActivityInstance(None, 1))
-
-                    print("created loop node:", loop_node)
-
-                    found = False
-                    for other_loop in loops:
-                        other_do = other_loop.body
-                        if isinstance(do_part, ActivityInstance):
-                            if isinstance(other_do, ActivityInstance) and other_do.label == do_part.label:
-                                found = True
-                                loop_node = other_loop
-                        elif isinstance(do_part, Graph):
-                            if isinstance(other_do, Graph):
-                                other_labels = {n.label for n in other_do.nodes}
-                                other_edges = {(s.label, t.label) for (s, t) in other_do.edges}
-                                new_edges_labels = {(s.label, t.label) for (s, t) in new_edges}
-                                if other_labels == new_label_group and other_edges == new_edges_labels:
-                                    found = True
-                                    loop_node = other_loop
-
-                    if not found:
-                        loops.add(loop_node)
-
-                    loops_frequencies[loop_node] += 1
-                    label_group_to_loop_map[frozenset(new_label_group)].add(do_part)
-
-                    for n in do_set:
-                        processed_nodes.add(n)
-                        mapping[n] = loop_node
-                        print(f"mapped loop node {n} to {loop_node}")
-                    if len(do_set) == 1:
-                        mapping[last] = loop_node
+                new_nodes_map = {}
+                label_counter = defaultdict(int)
+                for n in do_set:
+                    label_counter[n.label] += 1
+                    new_nodes_map[n] = ActivityInstance(n.label, label_counter[n.label])
+
+                new_edges = {(new_nodes_map[s], new_nodes_map[t]) for (s, t) in graph.edges if
+                             s in do_set and t in do_set}
+                do_part = Graph.from_trusted(
+                    nodes=frozenset(new_nodes_map.values()),
+                    edges=frozenset(new_edges),
+                )
+                loop_node = LOOP(body=do_part, redo=ActivityInstance(None, 1))
+
+                # reuse an equivalent loop found before (same labels and label-level edges in the body)
+                signature = LoopMiner.loop_signature(do_part)
+                if signature in loops_by_signature:
+                    loop_node = loops_by_signature[signature]
+                else:
+                    loops_by_signature[signature] = loop_node
+
+                loops_frequencies[loop_node] += 1
+                label_group_to_loop_map[frozenset(new_label_group)].add(do_part)
+
+                for n in do_set:
+                    processed_nodes.add(n)
+                    mapping[n] = loop_node
+                if len(do_set) == 1:
+                    mapping[last] = loop_node
+
         if not MULTIPLE_LOOPS:
-            print(f"Loop labels: {loop_groups}")
-            merged = []
+            groups = UnionFind()
             for label_group in loop_groups:
-                placed = False
-                for m in merged:
-                    if m & label_group:
-                        m |= label_group
-                        placed = True
-                        break
-                if not placed:
-                    merged.append(set(label_group))
-            print(f"Loop labels merged: {merged}")
-            changed = True
-            new_group_to_orders_mapping = {}
-            while changed:
-                changed = False
-                new_merged = []
-
-                while merged:
-                    grp = merged.pop()
-                    grp_orders = label_group_to_loop_map[frozenset(grp)]
-                    for other in merged:
-                        if grp & other:
-                            merged.remove(other)
-                            grp |= other
-                            grp_orders |= label_group_to_loop_map[frozenset(other)]
-                            changed = True
-                            break
-                    for order in grp_orders:
-                        old_nodes = set(order.nodes)
-                        for label in grp:
-                            node = ActivityInstance(label, 1)
-                            old_nodes.add(node)
-                        order.nodes = frozenset(old_nodes)
-                    new_merged.append(grp)
-                    new_group_to_orders_mapping[frozenset(grp)] = grp_orders
-                merged = new_merged
-            print(f"Loop labels merged new: {merged}")
-
-            # 5) build one LOOP per merged group
-            mapping = {}
+                groups.union_all(label_group)
+            merged = [set(group) for group in groups.groups()]
+
+            # collect the do-parts of all loop groups per merged group, and count the iterations
+            merged_orders = defaultdict(set)
+            for label_group, orders in label_group_to_loop_map.items():
+                merged_orders[groups.find(next(iter(label_group)))] |= orders
+            merged_iterations = defaultdict(int)
+            for label_group in loop_groups:
+                merged_iterations[groups.find(next(iter(label_group)))] += 1
 
-            if True:
-                for group in merged:
-                    print(new_group_to_orders_mapping[frozenset(group)])
-                    merged_order = combine_orders(new_group_to_orders_mapping[frozenset(group)])
-                    print("COMBINED INTO: ", new_group_to_orders_mapping[frozenset(group)])
-                    for n in group:
-                        mapping[n] = merged_order
-            if False:
-                for group in merged:
-                    new_nodes = {ActivityInstance(n, 1) for n in group}
-
-                    # for source in new_nodes:
-                    #     for target in new_nodes:
-                    #         if source != target and all(
-                    #                 (s, t) in graph.edges for s in reverse_mapping[source] for t in reverse_mapping[target]):
-                    #             new_edges.add((source, target))
-
-                    # sub-graph for the do-part
-                    # sub_edges = {
-                    #     (s, t)
-                    #     for (s, t) in graph.edges
-                    #     if s in group and t in group
-                    # }
-
-
-                    if len(new_nodes) == 1:
-                        do_part = new_nodes.pop()
-                    else:
-                        do_part = Graph(
-                            nodes=frozenset(new_nodes),
-                            edges=frozenset([]),
-                            # additional_information={VARIANT_FREQUENCY_KEY:
-                            #                             graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
-                        )
-                    loop_node = LOOP(body=do_part, redo=ActivityInstance(None, 1))
-                    # map every node in the group to this loop
-                    for n in group:
-                        mapping[n] = loop_node
-
-            # # Build redo submodel
-            # if len(redo_nodes) == 1:
-            #     redo = next(iter(redo_nodes))
-            # elif len(redo_nodes) > 1:
-            #     redo = Graph(
-            #         nodes=frozenset(redo_nodes),
-            #         edges=frozenset((s, t) for s, t in graph.edges if s in redo_nodes and t in redo_nodes),
-            #         additional_information={VARIANT_FREQUENCY_KEY: graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
-            #     )
-            # else:
-            #     redo = ActivityInstance(None, 1)
-            #
-            # body = first
-            # loop_node = LOOP(body=body, redo=redo)
-            #
-            # # map loop activities
-            # for inst in insts:
-            #     mapping[label] = loop_node
-            #     already_in_loop.add(inst)
-            #
-            # # map redo nodes also
-            # if isinstance(redo, Graph):
-            #     for redo_node in redo.nodes:
-            #         mapping[redo_node.label] = loop_node
-            #         already_in_loop.add(redo_node)
-            # elif isinstance(redo, ActivityInstance):
-            #     mapping[redo.label] = loop_node
-            #     already_in_loop.add(redo)
-
-        # 6) Identity mapping for the rest
-        # for n in graph.nodes:
-        #     if n not in mapping:
-        #         mapping[n] = n
+            # build one LOOP per merged group, with the combined do-parts as body, and map its labels to it
+            mapping = {}
+            loops_frequencies = {}
+            for group in merged:
+                root = groups.find(next(iter(group)))
+                # graphs are immutable: replace every order by a copy extended with the group labels
+                group_nodes = frozenset(ActivityInstance(label, 1) for label in group)
+                orders = {Graph.from_trusted(order.nodes | group_nodes, order.edges, order.additional_information)
+                          for order in merged_orders[root]}
+                loop_node = LOOP(body=combine_orders(orders), redo=ActivityInstance(None, 1))
+                loops_frequencies[loop_node] = merged_iterations[root]
+                for n in group:
+                    mapping[n] = loop_node
 
         return mapping, loops_frequencies
 
@@ -284,7 +155,7 @@ class LoopMiner:
                         if freq < 2:
                              new_node = body
                         else:
-                             new_node.body = body
+                             new_node = LOOP(body=body, redo=new_node.redo)
                         node_mapping[n] = new_node
                     reverse_mapping[node_mapping[n]].add(n)
                 else:
@@ -308,19 +179,9 @@ class LoopMiner:
 
             new_nodes = frozenset(mapping.values())
 
-        new_edges = set()
-
-        for source in new_nodes:
-            for target in new_nodes:
-                if source != target and all((s, t) in graph.edges for s in reverse_mapping[source] for t in reverse_mapping[target]):
-                    new_edges.add((source, target))
-        # for s, t in graph.edges:
-        #     source = mapping[s]
-        #     target = mapping[t]
-        #     if source != target:
-        #         new_edges.add((source, target))
+        new_edges = quotient_edges(graph, reverse_mapping, new_nodes)
         filtered_edges = {(s, t) for (s, t) in new_edges if (t, s) not in new_edges}
-        return Graph(
+        return Graph.from_trusted(
             nodes=new_nodes,
             edges=frozenset(filtered_edges),
             additional_information={VARIANT_FREQUENCY_KEY: graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
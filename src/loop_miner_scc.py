@@ -1,6 +1,11 @@
 # src/loop_miner_between_debug.py
 from collections import defaultdict, deque
+
+import numpy as np
+
+from src.mapping       import quotient_edges
 from src.objects       import LOOP, ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
+from src.union_find    import merge_overlapping_sets
 
 class LoopMinerBetween:
 
@@ -41,37 +46,12 @@ class LoopMinerBetween:
             raw_sets.append(between)
 
         # ─── 3) merge any overlapping sets ───────────────────────────────────────
-        merged = []
-        for s in raw_sets:
-            placed = False
-            for m in merged:
-                if m & s:
-                    m |= s
-                    placed = True
-                    break
-            if not placed:
-                merged.append(set(s))
-
-        changed = True
-        while changed:
-            changed = False
-            new_merged = []
-            while merged:
-                grp = merged.pop()
-                for other in merged:
-                    if grp & other:
-                        merged.remove(other)
-                        grp |= other
-                        changed = True
-                        break
-                new_merged.append(grp)
-            merged = new_merged
+        merged = merge_overlapping_sets(raw_sets)
 
         # ─── 4) attempt a loop‐cut on each merged label‐set ──────────────────────
         final_mapping    = {}
         final_frequencies = {}
         for label_set in merged:
-            print(f"\n=== Trying labels: {label_set} ===")
             mapping, freqs = cls._mine_on_labels(
                 graph, label_set, global_start, global_end
             )
@@ -91,43 +71,33 @@ class LoopMinerBetween:
         """
         Try a traditional redo-loop cut on the DFG induced by `labels`.
         On failure, peel off the single highest-frequency label and retry.
+
+        The DFG is built once as a weighted label matrix; the DFG of the active labels is its sub-matrix, so peeling
+        a label only masks its row and column.
         """
-        def build_dfg(lbls):
-            dfg_freq = defaultdict(int)
-            succ     = defaultdict(set)
-            pred     = defaultdict(set)
-
-            for s in graph.nodes:
-                for t in graph.nodes:
-                    if not (t, s) in graph.edges and (isinstance(s, ActivityInstance)
-                        and isinstance(t, ActivityInstance)
-                        and s.label in lbls
-                        and t.label in lbls):
-                        w = graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
-                        dfg_freq[(s.label, t.label)] += w
-                        succ[s.label].add(t.label)
-                        pred[t.label].add(s.label)
-            return dfg_freq, succ, pred
+        label_list = sorted(labels, key=lambda l: (l is not None, l))
+        dfg_matrix = cls._build_dfg_matrix(graph, label_list)
+        label_index = {l: i for i, l in enumerate(label_list)}
+
+        def mask(lbls):
+            res = np.zeros(len(label_list), dtype=bool)
+            res[[label_index[l] for l in lbls]] = True
+            return res
 
         active     = set(labels)
         peeled     = set()
 
         while len(active) >= 2:
-            dfg_freq, succ_lbl, pred_lbl = build_dfg(active)
+            active_mask = mask(active)
 
             A_start = active & global_start
             A_end   = active & global_end
             A1      = A_start | A_end
             A2      = active - A1
 
-            print(f" Active={active}")
-            print(f"  A_start={A_start}, A_end={A_end}")
-            print(f"  A1={A1}, A2={A2}")
-
             if A2 and cls._check_loop_cut(
-                succ_lbl, pred_lbl, A_start, A_end, A1, A2
+                dfg_matrix > 0, mask(A_start), mask(A_end), mask(A1), mask(A2)
             ):
-                print("  -> loop-cut ACCEPTED")
                 # carve out instances
                 body_nodes = {n for n in graph.nodes
                               if isinstance(n, ActivityInstance)
@@ -141,7 +111,7 @@ class LoopMinerBetween:
                 redo_edges = {(s,t) for (s,t) in graph.edges
                               if s in redo_nodes and t in redo_nodes}
 
-                body = Graph(
+                body = Graph.from_trusted(
                     nodes=frozenset(body_nodes),
                     edges=frozenset(body_edges),
                     additional_information={
@@ -149,7 +119,7 @@ class LoopMinerBetween:
                           graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
                     }
                 )
-                redo = Graph(
+                redo = Graph.from_trusted(
                     nodes=frozenset(redo_nodes),
                     edges=frozenset(redo_edges),
                     additional_information={
@@ -159,7 +129,7 @@ class LoopMinerBetween:
                 )
                 loop_node = LOOP(body=body, redo=redo)
 
-                freq = sum(w for ((u,v), w) in dfg_freq.items() if u in A2 and v in A1)
+                freq = dfg_matrix[np.ix_(mask(A2), mask(A1))].sum().item()
 
                 mapping = {}
                 for n in graph.nodes:
@@ -170,67 +140,91 @@ class LoopMinerBetween:
 
                 return mapping, {loop_node: freq}
 
-            # reject → peel off highest‐freq label
-            print("  -> loop-cut REJECTED; peeling one label")
-            freq_by_label = defaultdict(int)
-            for (u,v), w in dfg_freq.items():
-                freq_by_label[u] += w
-                freq_by_label[v] += w
+            # reject → peel off highest‐freq label (ties: first in label order)
+            active_dfg = np.where(np.outer(active_mask, active_mask), dfg_matrix, 0)
+            freq_by_label = active_dfg.sum(axis=1) + active_dfg.sum(axis=0)
+            freq_by_label[~active_mask] = -1
 
-            if "Repair (Complex)" in freq_by_label.keys():
+            if "Repair (Complex)" in active:
                 drop = "Repair (Complex)"
             else:
-                drop = max(freq_by_label, key=lambda l: freq_by_label[l])
-            print(f"DFG: {dfg_freq}")
-            print(f"    peeling: {drop} (freq={freq_by_label[drop]})")
+                drop = label_list[int(np.argmax(freq_by_label))]
             active.remove(drop)
             peeled.add(drop)
 
-        print("  -> no loop found.")
         return {}, {}
 
+    @staticmethod
+    def _build_dfg_matrix(graph, label_list):
+        """
+        Weighted label matrix of the DFG: entry (a, b) is the variant frequency times the number of pairs of
+        instances (s, t) (including s == t) with labels a and b such that t does not precede s.
+        """
+        label_index = {l: i for i, l in enumerate(label_list)}
+        k = len(label_list)
+        instance_counts = np.zeros(k, dtype=np.int64)
+        for n in graph.nodes:
+            if isinstance(n, ActivityInstance) and n.label in label_index:
+                instance_counts[label_index[n.label]] += 1
+
+        # precedence[a, b]: number of edges from an instance of a to an instance of b
+        edge_ids = np.fromiter((label_index[s.label] * k + label_index[t.label] for s, t in graph.edges
+                                if isinstance(s, ActivityInstance) and isinstance(t, ActivityInstance)
+                                and s.label in label_index and t.label in label_index), dtype=np.intp)
+        precedence = np.bincount(edge_ids, minlength=k * k).reshape((k, k))
+
+        w = graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
+        return w * (np.outer(instance_counts, instance_counts) - precedence.T)
+
 
     @staticmethod
-    def _check_loop_cut(succ, pred, A_start, A_end, A1, A2):
+    def _check_loop_cut(adjacency, A_start, A_end, A1, A2):
+        """
+        Checks the loop-cut conditions on the boolean DFG label matrix; the label groups are boolean masks over the
+        labels of the matrix.
+        """
         # (a) A1→A2 only from A_end
-        for a in A1:
-            for b in succ[a]:
-                if b in A2 and a not in A_end:
-                    print(f"    fail a→b rule: {a}→{b}")
-                    return False
+        if (adjacency & np.outer(A1 & ~A_end, A2)).any():
+            return False
 
         # (b) A2→A1 only into A_start
-        for b in A2:
-            for a in succ[b]:
-                if a in A1 and a not in A_start:
-                    print(f"    fail b→a rule: {b}→{a}")
-                    return False
+        if (adjacency & np.outer(A2, A1 & ~A_start)).any():
+            return False
 
         # (c) no edges within A2
-        for x in A2:
-            for y in A2:
-                if x!=y and (y in succ[x] or x in succ[y]):
-                    print(f"    fail internal-A2 rule: {x}↔{y}")
-                    return False
+        internal = adjacency.copy()
+        np.fill_diagonal(internal, False)
+        if (internal & np.outer(A2, A2)).any():
+            return False
 
         # (d) uniform arcs from A_end→A2
-        for b in A2:
-            preds = {p for p in pred[b] if p in A_end}
-            if preds and preds != A_end:
-                print(f"    fail uniform-end→A2 on {b}: preds={preds}")
-                return False
+        preds_count = adjacency[A_end].sum(axis=0)
+        if (A2 & (preds_count > 0) & (preds_count < A_end.sum())).any():
+            return False
 
         # (e) uniform arcs from A2→A_start
-        for b in A2:
-            succs = {s for s in succ[b] if s in A_start}
-            if succs and succs != A_start:
-                print(f"    fail uniform-A2→start on {b}: succs={succs}")
-                return False
+        succs_count = adjacency[:, A_start].sum(axis=1)
+        if (A2 & (succs_count > 0) & (succs_count < A_start.sum())).any():
+            return False
 
         return True
 
 
     @classmethod
     def apply_mapping(cls, graph: Graph, mapping: dict, loops_freq: dict):
-        from src.loop_miner import LoopMiner as Legacy
-        return Legacy.apply_mapping(graph, mapping, loops_freq)
+        """
+        Replaces every node by its image under the node mapping returned by find_loops (nodes without an image are
+        kept); the edges are those of the quotient graph, without the pairs that end up in both directions.
+        """
+        reverse_mapping = defaultdict(set)
+        for n in graph.nodes:
+            reverse_mapping[mapping.get(n, n)].add(n)
+        new_nodes = frozenset(reverse_mapping)
+
+        new_edges = quotient_edges(graph, reverse_mapping, new_nodes)
+        filtered_edges = {(s, t) for (s, t) in new_edges if (t, s) not in new_edges}
+        return Graph.from_trusted(
+            nodes=new_nodes,
+            edges=frozenset(filtered_edges),
+            additional_information={VARIANT_FREQUENCY_KEY: graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
+        )
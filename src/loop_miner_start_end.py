@@ -3,32 +3,39 @@ from collections import defaultdict, deque
 from pm4py.objects.powl.obj import SilentTransition
 
 from src.combine_order import combine_orders
+from src.mapping import quotient_edges, apply_node_mapping_on_single_graph
+from src.reachability import popcount
 from src.objects import LOOP, ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
 from src.skip_miner import SkipMiner
 
 LOOP_THRESHOLD = 0.9
 
 
-def get_inbetween(pred, succ, first, last):
-    reach = set()
-    dq = deque([first])
-    while dq:
-        u = dq.popleft()
-        for v in succ[u]:
-            if v not in reach:
-                reach.add(v)
-                dq.append(v)
-
-    anc = set()
-    dq = deque([last])
-    while dq:
-        u = dq.popleft()
-        for p in pred[u]:
-            if p not in anc:
-                anc.add(p)
-                dq.append(p)
-
-    return reach & anc
+def get_inbetween(graph, first, last):
+    """
+    Returns the nodes that are reachable from first and from which last is reachable, as a single AND of the
+    descendant bitset of first and the ancestor bitset of last.
+    """
+    node_index = graph.node_index
+    return graph.nodes_from_bits(graph.descendant_bits[node_index[first]] & graph.ancestor_bits[node_index[last]])
+
+
+def shortcut_free_adjacency(graph):
+    """
+    Successors and predecessors over the edges (s, t) without a two-step path s -> m -> t. For acyclic transitive
+    graphs, these are the edges of the transitive reduction; unlike the reduction, this is also defined for graphs
+    with cycles.
+    """
+    successors = graph.successors
+    succ = {node: set(targets) for node, targets in successors.items()}
+    for s, targets in successors.items():
+        for m in targets:
+            succ[s] -= successors[m]
+    pred = {node: set() for node in graph.nodes}
+    for s, targets in succ.items():
+        for t in targets:
+            pred[t].add(s)
+    return succ, pred
 
 
 def project_on_nodes(graph, proj_nodes):
@@ -41,7 +48,7 @@ def project_on_nodes(graph, proj_nodes):
 
     new_edges = {(new_nodes_map[s], new_nodes_map[t]) for (s, t) in graph.edges if
                  s in proj_nodes and t in proj_nodes}
-    do_part = Graph(
+    do_part = Graph.from_trusted(
         nodes=frozenset(new_nodes_map.values()),
         edges=frozenset(new_edges),
         additional_information={VARIANT_FREQUENCY_KEY:
@@ -59,36 +66,26 @@ class LoopMinerStartEnd:
             if isinstance(node, ActivityInstance) and node.label:
                 label_to_instances[node.label].append(node)
 
-        # 2) Build adjacency for reachability
-        succ = defaultdict(set)
-        pred = defaultdict(set)
-        t_edges = {(s, t) for (s, m1) in graph.edges for (m2, t) in graph.edges if m1 == m2 and (s, t) in graph.edges}
-        reduction = graph.edges - t_edges
-        for s, t in reduction:
-            succ[s].add(t)
-            pred[t].add(s)
+        # 2) Adjacency for reachability: on the transitive reduction and on the full order
+        if graph.is_acyclic:
+            reduction = graph.transitive_reduction
+            succ = reduction.successors
+            pred = reduction.predecessors
+        else:
+            # mapped loops can leave cycles, for which the transitive reduction is undefined
+            succ, pred = shortcut_free_adjacency(graph)
 
-        transitive_succ = defaultdict(set)
-        transitive_pred = defaultdict(set)
-        for s, t in graph.edges:
-            transitive_succ[s].add(t)
-            transitive_pred[t].add(s)
+        transitive_succ = graph.successors
+        transitive_pred = graph.predecessors
 
         # 3) Calculate number of predecessors ("distance to start") for each label
+        node_index = graph.node_index
         label_predecessors_count = {}
         for label, insts in label_to_instances.items():
-            all_preds = set()
+            all_preds = 0
             for inst in insts:
-                dq = deque([inst])
-                visited = set()
-                while dq:
-                    u = dq.popleft()
-                    for p in pred[u]:
-                        if p not in visited:
-                            visited.add(p)
-                            dq.append(p)
-                all_preds.update(visited)
-            label_predecessors_count[label] = len(all_preds)
+                all_preds |= graph.ancestor_bits[node_index[inst]]
+            label_predecessors_count[label] = popcount(all_preds)
         #
         # # 4) Sort labels by predecessor count (closer to start first)
         # ordered_labels = sorted(label_to_instances.keys(), key=lambda l: len(transitive_pred[sorted(label_to_instances[label], key=lambda x: x.number)[0]]), reverse=True)
@@ -128,7 +125,7 @@ class LoopMinerStartEnd:
             for i in range(len(insts) - 1):
 
                 first, last = insts_sorted[i], insts_sorted[i+1]
-                inbetween = get_inbetween(pred, succ, first, last)
+                inbetween = get_inbetween(graph, first, last)
 
                 direct_anc = pred[last]
 
@@ -142,10 +139,6 @@ class LoopMinerStartEnd:
                     current_loop_end_labels.add(first.label)
                 processed_labels.update(new_label_group)
 
-            print("current_loop_labels: ", current_labels_to_include)
-            print("current_loop_start_nodes: ", current_loop_start_labels)
-            print("current_loop_end_nodes: ", current_loop_end_labels)
-
             n = 0
             while n !=  len(current_loop_end_labels) + len(current_loop_start_labels):
                 n = len(current_loop_end_labels) + len(current_loop_start_labels)
@@ -156,7 +149,7 @@ class LoopMinerStartEnd:
                     for j in range(len(node_insts_sorted) - 1):
 
                         first, last = node_insts_sorted[j], node_insts_sorted[j + 1]
-                        inbetween = get_inbetween(pred, succ, first, last)
+                        inbetween = get_inbetween(graph, first, last)
 
                         direct_succ = succ[first]
                         current_loop_start_labels.update({x.label for x in inbetween & direct_succ})
@@ -175,7 +168,7 @@ class LoopMinerStartEnd:
                     for j in range(len(node_insts_sorted) - 1):
                         # sort instances
                         first, last = node_insts_sorted[j], node_insts_sorted[j + 1]
-                        inbetween = get_inbetween(pred, succ, first, last)
+                        inbetween = get_inbetween(graph, first, last)
                         direct_prec = pred[last]
                         current_loop_end_labels.update({x.label for x in inbetween & direct_prec})
                         if len(inbetween) == 0:
@@ -187,24 +180,16 @@ class LoopMinerStartEnd:
                         current_labels_to_include.update(new_label_group)
                         current_nodes_to_include.update(current_nodes)
 
-                print("new current_loop_labels: ", current_labels_to_include)
-                print("new current_loop_start_nodes: ", current_loop_start_labels)
-                print("new current_loop_end_nodes: ", current_loop_end_labels)
-
                 processed_labels.update(current_labels_to_include)
 
                 loop_groups.append(new_label_group)
 
             all_current_projections = set()
             sorted_nodes = sorted(current_nodes_to_include, key=lambda l: transitive_pred[l], reverse=False)
-            print("sorted_nodes: ", sorted_nodes)
             next_start = {sorted_nodes[0]}
             while len(next_start) > 0:
-                print(f"next_start: {next_start}")
                 projection_start = next_start
                 projection_end = set()
-                print(f"prj_start: {projection_start}")
-                print(f"prj_end: {projection_end}")
                 n = 0
                 while n != len(projection_start) + len(projection_end):
                     n = len(projection_start) + len(projection_end)
@@ -238,27 +223,18 @@ class LoopMinerStartEnd:
                     projection_end = projection_start
                     proj_nodes = projection_start
 
-                print(f"prj_start: {projection_start}")
-                print(f"prj_end: {projection_end}")
-                print(f"reach: {reach}")
-                print(f"anc: {anc}")
-                print(f"proj_nodes: {proj_nodes}")
                 projection = project_on_nodes(graph, proj_nodes)
-                print(f"projection: {projection}")
                 all_current_projections.add(projection)
                 next_start = set()
                 for u in projection_end:
                     next_start.update(succ[u])
                 next_start &= current_nodes_to_include
 
-            from src.miner import _mine
             orders = list(all_current_projections)
-            mapping_skips = SkipMiner.find_skips(orders)
-            orders = SkipMiner.apply_mapping(orders, mapping_skips)
+            mapping_skips, _ = SkipMiner.find_skips(orders)
+            orders = [apply_node_mapping_on_single_graph(order, mapping_skips) for order in orders]
 
             combined_order = combine_orders(orders)
-            print(f"all_orders: {all_current_projections}")
-            print(f"combined_order: {combined_order}")
             loop_node = LOOP(body=combined_order, redo=ActivityInstance(label=None, number=1))
 
             for n in current_labels_to_include:
@@ -368,19 +344,14 @@ class LoopMinerStartEnd:
 
         new_nodes = frozenset(mapping.values())
 
-        new_edges = set()
-
-        for source in new_nodes:
-            for target in new_nodes:
-                if source != target and all((s, t) in graph.edges for s in reverse_mapping[source] for t in reverse_mapping[target]):
-                    new_edges.add((source, target))
+        new_edges = quotient_edges(graph, reverse_mapping, new_nodes)
         # for s, t in graph.edges:
         #     source = mapping[s]
         #     target = mapping[t]
         #     if source != target:
         #         new_edges.add((source, target))
         filtered_edges = {(s, t) for (s, t) in new_edges if (t, s) not in new_edges}
-        return Graph(
+        return Graph.from_trusted(
             nodes=new_nodes,
             edges=frozenset(filtered_edges),
             additional_information={VARIANT_FREQUENCY_KEY: graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)}
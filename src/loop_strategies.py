@@ -0,0 +1,146 @@
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+from src.loop_miner import LoopMiner
+from src.loop_miner_start_end import LoopMinerStartEnd
+from src.objects import ActivityInstance, Graph
+
+AUTO = "auto"
+
+# the failures the loop miners raise by design on inputs they cannot handle (e.g., no loop cut, cyclic graphs);
+# AUTO falls back to the next strategy on these only, so that genuine bugs still propagate
+RECOVERABLE_ERRORS = (ValueError,)
+
+
+class GraphStatistics:
+    """
+    Cheap statistics of a variant graph, used to estimate the cost of the loop mining strategies.
+    """
+
+    def __init__(self, graph: Graph):
+        label_counts = Counter(n.label for n in graph.nodes if isinstance(n, ActivityInstance) and n.label)
+        self.nodes = len(graph.nodes)
+        self.edges = len(graph.edges)
+        self.labels = len(label_counts)
+        self.repeated_labels = sum(1 for count in label_counts.values() if count > 1)
+        self.repeated_instances = sum(count for count in label_counts.values() if count > 1)
+        self.density = self.edges / (self.nodes * (self.nodes - 1)) if self.nodes > 1 else 0.0
+
+    def __repr__(self):
+        return (f"GraphStatistics(nodes={self.nodes}, edges={self.edges}, labels={self.labels}, "
+                f"repeated_labels={self.repeated_labels}, repeated_instances={self.repeated_instances}, "
+                f"density={self.density:.2f})")
+
+
+class LoopStrategy:
+    """
+    A loop miner (any class with the find_loops/apply_mapping contract) with a cost estimator. Costs are rough
+    operation counts; they are only compared with each other.
+    """
+
+    def __init__(self, name: str, miner, estimate_cost: Callable[[GraphStatistics], float]):
+        self.name = name
+        self.miner = miner
+        self.estimate_cost = estimate_cost
+
+    def apply(self, graph: Graph) -> Graph:
+        mapping, loops_frequencies = self.miner.find_loops(graph)
+        return self.miner.apply_mapping(graph, mapping, loops_frequencies)
+
+    def __repr__(self):
+        return f"LoopStrategy({self.name})"
+
+
+class LoopMiningRecord:
+    """
+    Which strategy ran on a graph, how long it took and whether it succeeded.
+    """
+
+    def __init__(self, strategy: str, seconds: float, statistics: GraphStatistics, succeeded: bool):
+        self.strategy = strategy
+        self.seconds = seconds
+        self.statistics = statistics
+        self.succeeded = succeeded
+
+    def __repr__(self):
+        status = "ok" if self.succeeded else "failed"
+        return f"LoopMiningRecord({self.strategy}, {self.seconds:.4f}s, {status}, {self.statistics})"
+
+
+LOOP_STRATEGIES: Dict[str, LoopStrategy] = {}
+loop_mining_records: List[LoopMiningRecord] = []
+
+
+def register_loop_strategy(name: str, miner, estimate_cost: Callable[[GraphStatistics], float]):
+    LOOP_STRATEGIES[name] = LoopStrategy(name, miner, estimate_cost)
+
+
+# LoopMiner: bitset closure, one AND per consecutive instance pair, then one combine_orders per loop group
+register_loop_strategy(
+    "instances", LoopMiner,
+    lambda st: st.nodes * st.edges / 64 + st.repeated_instances * st.nodes)
+# LoopMinerBetween is not registered: on a transitively closed partial order, every global start (end) label has a
+# DFG arc to (from) every other label, so its loop cut never holds and it would always return the graph unchanged.
+# LoopMinerStartEnd: reduction, fixpoint over start/end labels with projections, skip mining and combine_orders
+register_loop_strategy(
+    "start_end", LoopMinerStartEnd,
+    lambda st: st.nodes * st.edges / 64 + st.repeated_instances ** 2 * st.nodes * (1 + st.density))
+
+
+def rank_strategies(statistics: GraphStatistics) -> List[LoopStrategy]:
+    """
+    Returns:
+        The registered strategies, cheapest estimated cost first.
+    """
+    return sorted(LOOP_STRATEGIES.values(), key=lambda strategy: strategy.estimate_cost(statistics))
+
+
+def mine_loops(graph: Graph, strategy: str = AUTO) -> Graph:
+    """
+    Applies a loop mining strategy to a graph with repeated activities; other graphs are returned as is.
+
+    Args:
+        graph (Graph): A variant graph.
+        strategy (str): The name of a registered strategy, or AUTO to run the fastest acceptable one, i.e., the
+            cheapest by estimated cost that does not fail (the next cheapest one is tried if a strategy raises one of
+            RECOVERABLE_ERRORS; any other exception propagates).
+
+    Returns:
+        The graph with the mined loops.
+    """
+    statistics = GraphStatistics(graph)
+    if statistics.repeated_labels == 0:
+        return graph
+
+    if strategy == AUTO:
+        candidates = rank_strategies(statistics)
+    elif strategy in LOOP_STRATEGIES:
+        candidates = [LOOP_STRATEGIES[strategy]]
+    else:
+        raise ValueError(f"Unknown loop mining strategy: {strategy}")
+
+    for i, candidate in enumerate(candidates):
+        start = time.perf_counter()
+        try:
+            result = candidate.apply(graph)
+        except RECOVERABLE_ERRORS:
+            loop_mining_records.append(
+                LoopMiningRecord(candidate.name, time.perf_counter() - start, statistics, False))
+            if i == len(candidates) - 1:
+                raise
+            continue
+        loop_mining_records.append(LoopMiningRecord(candidate.name, time.perf_counter() - start, statistics, True))
+        return result
+
+
+def summarize_loop_mining() -> Dict[str, tuple]:
+    """
+    Returns:
+        For every strategy that ran: (number of runs, number of failures, total seconds).
+    """
+    summary = {}
+    for record in loop_mining_records:
+        runs, failures, seconds = summary.get(record.strategy, (0, 0, 0.0))
+        summary[record.strategy] = (runs + 1, failures + (not record.succeeded), seconds + record.seconds)
+    return summary
@@ -1,5 +1,8 @@
 from collections import defaultdict
-from src.objects import Graph, Skip, SelfLoop, SkipSelfLoop
+
+import numpy as np
+
+from src.objects import Graph, Skip, SelfLoop, SkipSelfLoop, VARIANT_FREQUENCY_KEY
 
 
 def find_self_loops(mapping, new_nodes_counter):
@@ -102,16 +105,72 @@ def apply_node_mapping_on_single_graph(graph: Graph, node_mapping: dict):
             raise ValueError
 
     new_nodes = frozenset(node_mapping.values())
-    new_edges = set()
-
-    for source in new_nodes:
-        for target in new_nodes:
-            if source != target and all(
-                    (s, t) in graph.edges for s in reverse_mapping[source] for t in reverse_mapping[target]):
-                new_edges.add((source, target))
+    new_edges = quotient_edges(graph, reverse_mapping, new_nodes)
     # filtered_edges = {(s, t) for (s, t) in new_edges if (t, s) not in new_edges}
-    return Graph(
+    return Graph.from_trusted(
         nodes=new_nodes,
         edges=frozenset(new_edges),
         additional_information=graph.additional_information
     )
+
+
+def quotient_edges(graph: Graph, reverse_mapping: dict, new_nodes) -> set:
+    """
+    Computes the edges of the quotient of a graph under a node mapping: (source, target) with source != target is
+    an edge iff every node mapped to source precedes every node mapped to target in the graph, i.e., iff the block
+    of the adjacency matrix between the two preimages is all ones. Empty blocks (new nodes without preimage) count
+    as all ones.
+
+    Args:
+        graph (Graph): The original graph.
+        reverse_mapping (dict): Maps each new node to the set of nodes of the graph mapped to it; every node of the
+            graph must be in exactly one of these sets.
+        new_nodes: The nodes of the quotient graph.
+
+    Returns:
+        Set of (source, target) edges over new_nodes.
+    """
+    new_nodes = list(new_nodes)
+    m = len(new_nodes)
+    block_ids = {n: b for b, new_node in enumerate(new_nodes) for n in reverse_mapping.get(new_node, ())}
+    block_sizes = np.fromiter((len(reverse_mapping.get(new_node, ())) for new_node in new_nodes),
+                              dtype=np.intp, count=m)
+
+    # block sums of the adjacency matrix (G A G^T for the block membership matrix G), one edge at a time
+    edge_blocks = np.fromiter((block_ids[s] * m + block_ids[t] for s, t in graph.edges),
+                              dtype=np.intp, count=len(graph.edges))
+    block_edge_counts = np.bincount(edge_blocks, minlength=m * m).reshape((m, m))
+
+    # a block is all ones iff it holds as many edges as node pairs
+    full_blocks = block_edge_counts == np.outer(block_sizes, block_sizes)
+    np.fill_diagonal(full_blocks, False)
+    sources, targets = np.nonzero(full_blocks)
+    return {(new_nodes[a], new_nodes[b]) for a, b in zip(sources.tolist(), targets.tolist())}
+
+
+def deduplicate_orders(orders):
+    """
+    Merges identical partial orders into one, summing up their VARIANT_FREQUENCY_KEY. The first occurrence of every
+    order keeps its position; orders without duplicates are returned unchanged.
+    """
+    frequencies = {}
+    first_occurrences = {}
+    for graph in orders:
+        frequency = graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
+        if graph in frequencies:
+            frequencies[graph] += frequency
+        else:
+            frequencies[graph] = frequency
+            first_occurrences[graph] = graph
+
+    if len(frequencies) == len(orders):
+        return list(orders)
+
+    res = []
+    for graph, frequency in frequencies.items():
+        graph = first_occurrences[graph]
+        if frequency != graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1):
+            graph = Graph.from_trusted(graph.nodes, graph.edges,
+                                       {**graph.additional_information, VARIANT_FREQUENCY_KEY: frequency})
+        res.append(graph)
+    return res
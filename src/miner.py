@@ -1,8 +1,13 @@
+from collections import Counter, OrderedDict
+
 from src.combine_order import combine_orders
-from src.constants import LOOP_MINING, XOR_MINING
-from src.mapping import find_self_loops, apply_node_mapping_on_single_graph
+from src.precedence import PrecedenceSummary
+from src.constants import LOOP_MINING, XOR_MINING, MINING_CACHE_SIZE, LOOP_STRATEGY
+from src.loop_strategies import mine_loops, loop_mining_records, summarize_loop_mining
+from src.mapping import find_self_loops, apply_node_mapping_on_single_graph, deduplicate_orders
 from src.xor_miner import XORMiner, get_activity
-from src.objects import XOR, simplified_model_to_powl, ActivityInstance, SelfLoop, Skip, Graph, LOOP
+from src.variant_index import index_variants_by_label
+from src.objects import XOR, simplified_model_to_powl, ActivityInstance, SelfLoop, Skip, Graph, LOOP, VARIANT_FREQUENCY_KEY
 
 from src.skip_miner import SkipMiner
 
@@ -28,7 +33,70 @@ def apply_mining_algorithm_recursively(node):
         raise TypeError('Unsupported node type')
 
 
+class MiningCache:
+    """
+    Bounded LRU memo of _mine, keyed by an order-independent fingerprint of the input orders: the multiset of
+    (order, variant frequency) pairs, plus whether the input consists of a single order (which _mine takes as is,
+    additional information included). The mined model does not depend on the order of the list.
+    Graphs are returned and stored as copies with their own additional_information dict, so that callers that
+    update it do not change the cached model.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(orders):
+        frequencies = Counter((order, order.additional_information.get(VARIANT_FREQUENCY_KEY, 1)) for order in orders)
+        return frozenset(frequencies.items()), len(orders) == 1
+
+    @staticmethod
+    def _copy(model):
+        if isinstance(model, Graph):
+            return Graph.from_trusted(model.nodes, model.edges, dict(model.additional_information))
+        return model
+
+    def get(self, key):
+        model = self.entries.get(key)
+        if model is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self._copy(model)
+
+    def put(self, key, model):
+        self.entries[key] = self._copy(model)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"MiningCache(size={len(self.entries)}/{self.max_size}, hits={self.hits}, misses={self.misses})"
+
+
+mining_cache = MiningCache(MINING_CACHE_SIZE)
+
+
 def _mine(orders):
+    if MINING_CACHE_SIZE < 1 or len(orders) < 1:
+        return _mine_uncached(orders)
+    key = MiningCache.fingerprint(orders)
+    model = mining_cache.get(key)
+    if model is None:
+        model = _mine_uncached(orders)
+        mining_cache.put(key, model)
+    return model
+
+
+def _mine_uncached(orders):
 
     if len(orders) < 1:
         raise ValueError("Input list of partial orders is empty!")
@@ -36,8 +104,7 @@ def _mine(orders):
     all_activity_labels = set()
 
     for graph in orders:
-        for node in graph.nodes:
-            all_activity_labels.update(get_activity(node))
+        all_activity_labels.update(get_activity(graph))
 
     if LOOP_MINING:
         if len(all_activity_labels) == 1:
@@ -48,17 +115,21 @@ def _mine(orders):
             else:
                 return activity
 
+    # one precedence summary per set of orders: it is rebuilt only if XOR or loop mining replaces nodes
+    summary = PrecedenceSummary(orders)
+
     if XOR_MINING:
-        xor_clusters = XORMiner.find_disjoint_activities(orders, all_activity_labels)
+        xor_clusters = XORMiner.find_disjoint_activities(orders, all_activity_labels, summary)
 
         label_mapping = {}
         if xor_clusters is not None:
+            label_index = index_variants_by_label(orders)
 
             for cluster in xor_clusters:
 
                 sub_models = []
                 for group in cluster:
-                    projected_log = XORMiner.project_partial_orders_on_groups(orders, list(group))
+                    projected_log = XORMiner.project_partial_orders_on_groups(orders, list(group), label_index)
                     sub_models.append(_mine(projected_log))
                 model = XOR(children=frozenset(sub_models))
                 for group in cluster:
@@ -68,19 +139,31 @@ def _mine(orders):
                         label_mapping[activity_label] = model
 
         orders = XORMiner.apply_mapping(orders, label_mapping)
+        # without a mapping, the orders are only deduplicated, which keeps the weighted relations
+        if label_mapping:
+            summary = PrecedenceSummary(orders)
 
+    if LOOP_MINING and LOOP_STRATEGY is not None:
+        looped_orders = [mine_loops(graph, LOOP_STRATEGY) for graph in orders]
+        if any(looped is not graph for looped, graph in zip(looped_orders, orders)):
+            summary = PrecedenceSummary(looped_orders)
+        orders = looped_orders
 
-    mapping_skips, new_nodes_counter = SkipMiner.find_skips(orders)
+    mapping_skips, new_nodes_counter = SkipMiner.find_skips(orders, summary)
     if LOOP_MINING:
         node_mapping = find_self_loops(mapping_skips, new_nodes_counter)
     else:
         node_mapping = mapping_skips
-    orders = [apply_node_mapping_on_single_graph(g, node_mapping) for g in orders]
+    # duplicates do not change the combined order, but a single input order is taken as is
+    single_order = len(orders) == 1
+    # the precedence summary still describes the mapped orders if no node is replaced
+    identity_mapping = all(node == new_node for node, new_node in node_mapping.items())
+    orders = deduplicate_orders([apply_node_mapping_on_single_graph(g, node_mapping) for g in orders])
 
-    if len(orders) == 1:
+    if single_order:
         order = orders[0]
     else:
-        order = combine_orders(orders)
+        order = combine_orders(orders, summary if identity_mapping else None)
 
 
     if len(order.nodes) == 0:
@@ -93,7 +176,12 @@ def _mine(orders):
 
 
 def mine_powl_from_partial_orders(partial_orders):
+    mining_cache.clear()
+    loop_mining_records.clear()
     order = _mine(partial_orders)
+    print(f"Mining cache: {mining_cache}")
+    if loop_mining_records:
+        print(f"Loop mining (runs, failures, seconds): {summarize_loop_mining()}")
     # mapping_self_loops = SelfLoopMiner.find_self_loops(order)
     # order = apply_node_mapping_on_single_graph(order, mapping_self_loops)
     print("✅ Done Mining!")
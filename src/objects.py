@@ -1,13 +1,46 @@
 from pm4py.objects.powl.obj import StrictPartialOrder, Transition, OperatorPOWL, SilentTransition
 from pm4py.objects.process_tree.obj import Operator
+from weakref import WeakValueDictionary
+
+from src.reachability import topological_sort, closure_bits, reduction_bits, iter_bits
 
 VARIANT_FREQUENCY_KEY = "@@variant_frequency"
 ENABLE_DUPLICATION = True
+# debug mode: also validate the graphs created through Graph.from_trusted
+VALIDATE_GRAPHS = False
+
+# Hash-consing table for the immutable model nodes: constructing a node that already exists returns the existing
+# instance, so identical subtrees are shared and equality usually short-circuits on identity.
+_interned_nodes = WeakValueDictionary()
+
+
+def _identity_key(*nodes):
+    """
+    Component of an intern key that tells children apart by identity. Equality of model nodes is structural and
+    ignores the concrete class (e.g., Skip(a) == XOR({a, tau})), so keying on the children alone would return a node
+    built over a child of another class. The key also holds the children, which keeps their ids valid.
+    """
+    return tuple(id(node) for node in nodes)
+
+
+def _intern(cls, key, hash_key, **attributes):
+    instance = _interned_nodes.get(key)
+    if instance is None:
+        instance = object.__new__(cls)
+        for name, value in attributes.items():
+            setattr(instance, name, value)
+        instance._hash = hash(hash_key)
+        instance._labels = None
+        _interned_nodes[key] = instance
+    return instance
+
 
 class XOR:
-    def __init__(self, children: frozenset):
+    __slots__ = ('children', '_hash', '_labels', '__weakref__')
+
+    def __new__(cls, children: frozenset):
         """
-        Initialize an XOR node.
+        Create (or reuse) an XOR node.
 
         Args:
             children (frozenset): A frozenset of child nodes (e.g., ActivityInstance, XOR, LOOP).
@@ -16,18 +49,33 @@ class XOR:
             raise TypeError("Children must be provided as a frozenset.")
         if len(children) < 1:
             raise ValueError("XOR must have at least one child.")
-        self.children = children
+        key = (cls, frozenset(_identity_key(*children)), children)
+        return _intern(cls, key, ('XOR', children), children=children)
+
+    def __reduce__(self):
+        return XOR, (self.children,)
+
+    @property
+    def labels(self) -> frozenset:
+        """
+        The activity labels occurring in this subtree (computed once).
+        """
+        if self._labels is None:
+            self._labels = frozenset().union(*(child.labels for child in self.children))
+        return self._labels
 
     def __repr__(self):
         return f"XOR({', '.join(repr(child) for child in sorted(self.children))})"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, XOR):
-            return self.children == other.children
+            return self._hash == other._hash and self.children == other.children
         return False
 
     def __hash__(self):
-        return hash(('XOR', self.children))
+        return self._hash
 
     def __lt__(self, other):
         if isinstance(other, XOR):
@@ -44,13 +92,18 @@ class XOR:
     #     return XOR(frozenset(normalized_children))
 
 class Skip(XOR):
+    __slots__ = ('element',)
     _allow_init = False
 
-    def __init__(self, element):
+    def __new__(cls, element):
         if not Skip._allow_init:
             raise RuntimeError("You must use create() to create this object!")
-        super().__init__(frozenset([element, ActivityInstance(None, 1)]))
-        self.element = element
+        children = frozenset([element, ActivityInstance(None, 1)])
+        return _intern(cls, (cls, _identity_key(element), element), ('XOR', children), children=children,
+                       element=element)
+
+    def __reduce__(self):
+        return Skip.create, (self.element,)
 
     @classmethod
     def create(cls, element):
@@ -70,27 +123,42 @@ class Skip(XOR):
     #     return Skip(normalized_element)
 
 class LOOP:
-    def __init__(self, body, redo):
+    __slots__ = ('body', 'redo', '_hash', '_labels', '__weakref__')
+
+    def __new__(cls, body, redo):
         """
-        Initialize a LOOP node.
+        Create (or reuse) a LOOP node.
 
         Args:
             body (Any): The main body node (e.g., ActivityInstance, XOR, LOOP).
             redo (Any): The redo node (after a failed loop execution).
         """
-        self.body = body
-        self.redo = redo
+        return _intern(cls, (cls, _identity_key(body, redo), body, redo), ('LOOP', body, redo), body=body, redo=redo)
+
+    def __reduce__(self):
+        return LOOP, (self.body, self.redo)
+
+    @property
+    def labels(self) -> frozenset:
+        """
+        The activity labels occurring in this subtree (computed once).
+        """
+        if self._labels is None:
+            self._labels = self.body.labels | self.redo.labels
+        return self._labels
 
     def __repr__(self):
         return f"LOOP(body={repr(self.body)}, redo={repr(self.redo)})"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, LOOP):
-            return self.body == other.body and self.redo == other.redo
+            return self._hash == other._hash and self.body == other.body and self.redo == other.redo
         return False
 
     def __hash__(self):
-        return hash(('LOOP', self.body, self.redo))
+        return self._hash
 
     def __lt__(self, other):
         if isinstance(other, LOOP):
@@ -108,31 +176,41 @@ class LOOP:
     #     return LOOP(normalized_body, normalized_redo)
 
 class SelfLoop(LOOP):
-    def __init__(self, element):
+    __slots__ = ('element',)
+
+    def __new__(cls, element):
         if isinstance(element, SelfLoop):
             element = element.element
-            super().__init__(element, ActivityInstance(None, 1))
         elif isinstance(element, Skip) or isinstance(element, SkipSelfLoop):
-            self.__class__ = SkipSelfLoop
-            element = element.element
-            super().__init__(ActivityInstance(None, 1), element)
-        else:
-            super().__init__(element, ActivityInstance(None, 1))
-        self.element = element
+            return SkipSelfLoop(element.element)
+        silent = ActivityInstance(None, 1)
+        return _intern(cls, (cls, _identity_key(element), element), ('LOOP', element, silent), body=element,
+                       redo=silent, element=element)
+
+    def __reduce__(self):
+        return SelfLoop, (self.element,)
 
 
 class SkipSelfLoop(LOOP):
-    def __init__(self, element):
+    __slots__ = ('element',)
+
+    def __new__(cls, element):
         if isinstance(element, SkipSelfLoop) or isinstance(element, SelfLoop) or isinstance(element, Skip):
             element = element.element
-        super().__init__(ActivityInstance(None, 1), element)
-        self.element = element
+        silent = ActivityInstance(None, 1)
+        return _intern(cls, (cls, _identity_key(element), element), ('LOOP', silent, element), body=silent,
+                       redo=element, element=element)
+
+    def __reduce__(self):
+        return SkipSelfLoop, (self.element,)
 
 
 class ActivityInstance:
-    def __init__(self, label: str|None, number: int):
+    __slots__ = ('label', 'number', '_hash', '_labels', '__weakref__')
+
+    def __new__(cls, label: str|None, number: int):
         """
-        Initialize an ActivityInstance.
+        Create (or reuse) an ActivityInstance.
 
         Args:
             label (str): The label of the activity (e.g., 'A', 'Review').
@@ -142,8 +220,19 @@ class ActivityInstance:
             number = 1
         if number < 1:
             raise ValueError("Activity number must be at least 1.")
-        self.label = label
-        self.number = number
+        return _intern(cls, (cls, label, number), (label, number), label=label, number=number)
+
+    def __reduce__(self):
+        return ActivityInstance, (self.label, self.number)
+
+    @property
+    def labels(self) -> frozenset:
+        """
+        The activity label as a singleton set (empty for silent activities).
+        """
+        if self._labels is None:
+            self._labels = frozenset([self.label]) if self.label else frozenset()
+        return self._labels
 
     def __repr__(self):
         if self.number == 1:
@@ -151,12 +240,14 @@ class ActivityInstance:
         return f"({self.label}, {self.number})"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, ActivityInstance):
             return self.label == other.label and self.number == other.number
         return False
 
     def __hash__(self):
-        return hash((self.label, self.number))
+        return self._hash
 
     def __lt__(self, other):
         if isinstance(other, ActivityInstance):
@@ -176,6 +267,11 @@ class ActivityInstance:
 
 
 class Graph:
+    # Graphs are immutable, but not interned: equal graphs may carry different additional information
+    # (e.g., variant frequencies). The hash and the derived views (adjacency, reachability, transitive reduction)
+    # are computed at most once.
+    __slots__ = ('nodes', 'edges', 'additional_information', '_hash', '_labels', '_views')
+
     def __init__(self, nodes: frozenset, edges: frozenset, additional_information=None):
         """
         Initialize a Graph Instance with nodes and edges.
@@ -184,8 +280,41 @@ class Graph:
             nodes (frozenset): A frozenset of nodes (ActivityInstance, XOR, LOOP).
             edges (frozenset): A frozenset of (source, target) tuples where source and target are in nodes.
         """
-        if additional_information is None:
-            additional_information = {}
+        Graph._validate(nodes, edges)
+
+        self.nodes = nodes
+        self.edges = edges
+        self.additional_information = additional_information if additional_information else {}
+        self._hash = None
+        self._labels = None
+        self._views = None
+
+    @classmethod
+    def from_trusted(cls, nodes: frozenset, edges: frozenset, additional_information=None, partial_order=False):
+        """
+        Create a Graph from nodes and edges that are valid by construction (e.g., derived from existing graphs inside
+        the mining recursion), skipping the per-edge validation of __init__. Set VALIDATE_GRAPHS to validate anyway;
+        the edges are then also checked to be a strict partial order (acyclic and transitively closed) if
+        partial_order is set. Intermediate graphs of the mining (e.g., after mapping nodes onto loops) may be neither.
+        """
+        if VALIDATE_GRAPHS:
+            graph = cls(nodes, edges, additional_information)
+            if partial_order and not graph.is_acyclic:
+                raise ValueError("The edges of a partial order must be acyclic.")
+            if partial_order and not graph.is_transitive:
+                raise ValueError("The edges of a partial order must be transitively closed.")
+            return graph
+        graph = object.__new__(cls)
+        graph.nodes = nodes
+        graph.edges = edges
+        graph.additional_information = additional_information if additional_information else {}
+        graph._hash = None
+        graph._labels = None
+        graph._views = None
+        return graph
+
+    @staticmethod
+    def _validate(nodes, edges):
         if not isinstance(nodes, frozenset):
             raise TypeError("Nodes must be a frozenset.")
         if not isinstance(edges, frozenset):
@@ -196,9 +325,127 @@ class Graph:
             if edge[0] not in nodes or edge[1] not in nodes:
                 raise ValueError(f"Edge {edge} refers to nodes not in the node set.")
 
-        self.nodes = nodes
-        self.edges = edges
-        self.additional_information = additional_information if additional_information else {}
+    def __reduce__(self):
+        return Graph, (self.nodes, self.edges, self.additional_information)
+
+    @property
+    def labels(self) -> frozenset:
+        """
+        The activity labels occurring in the nodes of this graph (computed once).
+        """
+        if self._labels is None:
+            self._labels = frozenset().union(*(node.labels for node in self.nodes))
+        return self._labels
+
+    def _view(self, name, compute):
+        if self._views is None:
+            self._views = {}
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = compute()
+        return view
+
+    @property
+    def successors(self) -> dict:
+        """
+        Maps every node to the frozenset of its direct successors.
+        """
+        def compute():
+            successors = {node: set() for node in self.nodes}
+            for s, t in self.edges:
+                successors[s].add(t)
+            return {node: frozenset(targets) for node, targets in successors.items()}
+        return self._view('successors', compute)
+
+    @property
+    def predecessors(self) -> dict:
+        """
+        Maps every node to the frozenset of its direct predecessors.
+        """
+        def compute():
+            predecessors = {node: set() for node in self.nodes}
+            for s, t in self.edges:
+                predecessors[t].add(s)
+            return {node: frozenset(sources) for node, sources in predecessors.items()}
+        return self._view('predecessors', compute)
+
+    @property
+    def node_order(self) -> tuple:
+        """
+        The nodes in a topological order, or in arbitrary order if the graph has a cycle. The bitsets of
+        descendant_bits and ancestor_bits refer to positions in this order (see node_index).
+        """
+        def compute():
+            order = topological_sort(self.nodes, self.successors)
+            return tuple(order) if order is not None else tuple(self.nodes)
+        return self._view('node_order', compute)
+
+    @property
+    def node_index(self) -> dict:
+        return self._view('node_index', lambda: {node: i for i, node in enumerate(self.node_order)})
+
+    @property
+    def is_acyclic(self) -> bool:
+        def compute():
+            index = self.node_index
+            return all(index[s] < index[t] for s, t in self.edges)
+        return self._view('is_acyclic', compute)
+
+    def _successor_bits(self, successors):
+        index = self.node_index
+        bits = []
+        for node in self.node_order:
+            node_bits = 0
+            for successor in successors[node]:
+                node_bits |= 1 << index[successor]
+            bits.append(node_bits)
+        return bits
+
+    @property
+    def descendant_bits(self) -> list:
+        """
+        For every node (by position in node_order), the bitset of the nodes reachable from it.
+        """
+        return self._view('descendant_bits',
+                          lambda: closure_bits(self._successor_bits(self.successors), self.is_acyclic))
+
+    @property
+    def ancestor_bits(self) -> list:
+        """
+        For every node (by position in node_order), the bitset of the nodes from which it is reachable.
+        """
+        def compute():
+            ancestors = [0] * len(self.node_order)
+            for i, descendants in enumerate(self.descendant_bits):
+                for j in iter_bits(descendants):
+                    ancestors[j] |= 1 << i
+            return ancestors
+        return self._view('ancestor_bits', compute)
+
+    @property
+    def is_transitive(self) -> bool:
+        return self._view('is_transitive',
+                          lambda: self._successor_bits(self.successors) == self.descendant_bits)
+
+    def nodes_from_bits(self, bits: int) -> set:
+        order = self.node_order
+        return {order[i] for i in iter_bits(bits)}
+
+    @property
+    def transitive_reduction(self) -> 'Graph':
+        """
+        The Hasse diagram: the graph with the same nodes and only the edges not implied by transitivity.
+        """
+        def compute():
+            if not self.is_acyclic:
+                raise ValueError("The transitive reduction is only defined for acyclic graphs.")
+            order = self.node_order
+            reduction = reduction_bits(self._successor_bits(self.successors), self.descendant_bits)
+            edges = frozenset((order[i], order[j]) for i, bits in enumerate(reduction) for j in iter_bits(bits))
+            if len(edges) == len(self.edges):
+                return self
+            return Graph.from_trusted(self.nodes, edges, self.additional_information)
+        return self._view('transitive_reduction', compute)
 
     def __repr__(self):
         nodes_repr = ', '.join(sorted(map(repr, self.nodes)))
@@ -206,12 +453,16 @@ class Graph:
         return f"Graph(Nodes: {{{nodes_repr}}}, Edges: {{{edges_repr}}}, {self.additional_information})"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Graph):
-            return self.nodes == other.nodes and self.edges == other.edges
+            return hash(self) == hash(other) and self.nodes == other.nodes and self.edges == other.edges
         return False
 
     def __hash__(self):
-        return hash(('Graph', self.nodes, self.edges))
+        if self._hash is None:
+            self._hash = hash(('Graph', self.nodes, self.edges))
+        return self._hash
 
     def __lt__(self, other):
         if isinstance(other, Graph):
@@ -262,14 +513,14 @@ def simplified_model_to_powl(model, add_instance_number = False):
 
     len_all = len(po.order.nodes)
 
-    start_len = len(po.order.get_start_nodes())
+    start_len = sum(1 for submodel in submodels if not model.predecessors[submodel])
     if start_len > 1 and start_len != len_all:
         start = SilentTransition()
         po.order.add_node(start)
         for node in set(po.order.nodes) - {start}:
             po.add_edge(start, node)
 
-    end_len = len(po.order.get_end_nodes())
+    end_len = sum(1 for submodel in submodels if not model.successors[submodel])
     if end_len > 1 and end_len != len_all:
         end = SilentTransition()
         po.order.add_node(end)
@@ -281,7 +532,8 @@ def simplified_model_to_powl(model, add_instance_number = False):
     if not po.order.is_irreflexive():
         raise ValueError('Not irreflexive!')
 
-    if not po.order.is_transitive():
+    # the silent start and end nodes are connected to all other nodes, so they cannot break transitivity
+    if not model.is_transitive:
         raise ValueError('Not transitive!')
 
     return po
\ No newline at end of file
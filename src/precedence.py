@@ -0,0 +1,111 @@
+from typing import List
+
+import numpy as np
+
+from src.objects import Graph, VARIANT_FREQUENCY_KEY
+
+
+class PrecedenceSummary:
+    """
+    Global precedence relations of a list of partial orders, as NumPy matrices over the node ids (positions in the
+    sorted list of all nodes). Every partial order counts with its variant frequency:
+
+    - occurrences[u]: how often u occurs;
+    - co_occurrences[u, v]: how often u and v occur together;
+    - before[u, v]: how often u precedes v.
+
+    So u is sometimes before v iff before[u, v] > 0, and always before v (whenever both occur) iff
+    before[u, v] == co_occurrences[u, v] > 0. The matrices are computed on first access.
+    """
+
+    def __init__(self, orders: List[Graph]):
+        self.orders = orders
+        self._nodes = None
+        self._node_ids = None
+        self._matrices = None
+
+    @property
+    def nodes(self) -> list:
+        if self._nodes is None:
+            self._nodes = sorted({x for g in self.orders for x in g.nodes})
+        return self._nodes
+
+    @property
+    def node_ids(self) -> dict:
+        if self._node_ids is None:
+            self._node_ids = {x: i for i, x in enumerate(self.nodes)}
+        return self._node_ids
+
+    @property
+    def occurrences(self) -> np.ndarray:
+        return self._compute()[0]
+
+    @property
+    def co_occurrences(self) -> np.ndarray:
+        return self._compute()[1]
+
+    @property
+    def before(self) -> np.ndarray:
+        return self._compute()[2]
+
+    def _compute(self):
+        if self._matrices is None:
+            idx = self.node_ids
+            n = len(idx)
+            orders = self.orders
+
+            frequencies = np.fromiter((g.additional_information.get(VARIANT_FREQUENCY_KEY, 1) for g in orders),
+                                      dtype=np.float64, count=len(orders))
+            incidence = np.zeros((len(orders), n), dtype=np.float64)
+            order_ids = [i for i, g in enumerate(orders) for _ in g.nodes]
+            node_ids = [idx[u] for g in orders for u in g.nodes]
+            incidence[order_ids, node_ids] = 1
+            occurrences = frequencies @ incidence
+            co_occurrences = (incidence * frequencies[:, None]).T @ incidence
+
+            edge_order_ids = np.fromiter((i for i, g in enumerate(orders) for _ in g.edges), dtype=np.intp)
+            edge_ids = np.fromiter((idx[s] * n + idx[t] for g in orders for s, t in g.edges), dtype=np.intp)
+            before = np.bincount(edge_ids, weights=frequencies[edge_order_ids], minlength=n * n).reshape((n, n))
+
+            self._matrices = occurrences, co_occurrences, before
+        return self._matrices
+
+    def sometimes_before(self) -> np.ndarray:
+        return self.before > 0
+
+    def always_before(self) -> np.ndarray:
+        return (self.before == self.co_occurrences) & (self.co_occurrences > 0)
+
+    def conflicts(self) -> np.ndarray:
+        """
+        Returns:
+            Boolean matrix of the pairs (u, v) that occur together without u preceding v in at least one partial
+            order, including each node with itself.
+        """
+        conflicts = self.co_occurrences > self.before
+        np.fill_diagonal(conflicts, True)
+        return conflicts
+
+    def label_co_occurrences(self, labels: List[str]) -> np.ndarray:
+        """
+        Args:
+            labels (List[str]): The activity labels of the nodes; they define the rows and columns of the result.
+
+        Returns:
+            Matrix with entry (i, j) > 0 iff labels[i] and labels[j] occur together in at least one partial order
+            (the entries count co-occurring node pairs with these labels, weighted by frequency).
+        """
+        label_index = {label: i for i, label in enumerate(labels)}
+        membership = np.zeros((len(self.nodes), len(labels)), dtype=np.float64)
+        for i, node in enumerate(self.nodes):
+            for label in node.labels:
+                membership[i, label_index[label]] = 1
+        return membership.T @ self.co_occurrences @ membership
+
+    def precedes(self, source, target) -> bool:
+        """
+        Returns:
+            True iff source precedes target in at least one partial order.
+        """
+        idx = self.node_ids
+        return bool(self.before[idx[source], idx[target]] > 0)
@@ -0,0 +1,162 @@
+from typing import List, Iterator, Dict, Any, Iterable, Set, Tuple
+
+import numpy as np
+
+
+def topological_sort(nodes: Iterable[Any], successors: Dict[Any, Iterable[Any]]) -> List[Any] or None:
+    """
+    Kahn's algorithm; ties are broken by the given order of the nodes.
+
+    Returns:
+        The nodes in topological order, or None if the graph has a cycle.
+    """
+    nodes = list(nodes)
+    in_degree = {node: 0 for node in nodes}
+    for node in nodes:
+        for successor in successors[node]:
+            in_degree[successor] += 1
+    stack = [node for node in reversed(nodes) if in_degree[node] == 0]
+    order = []
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        for successor in successors[node]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                stack.append(successor)
+    return order if len(order) == len(nodes) else None
+
+
+def closure_bits(successor_bits: List[int], acyclic: bool = True) -> List[int]:
+    """
+    Transitive closure on bitsets: bit j of the i-th result is set iff node j is reachable from node i by a
+    non-empty path.
+
+    Args:
+        successor_bits (List[int]): For every node, the bitset of its direct successors.
+        acyclic (bool): If True, the nodes must be indexed in topological order (every edge goes from a lower to a
+            higher index); the closure then takes one pass in reverse order. Otherwise, Warshall's algorithm is used.
+    """
+    n = len(successor_bits)
+    descendants = list(successor_bits)
+    if acyclic:
+        for i in range(n - 1, -1, -1):
+            bits = successor_bits[i]
+            reach = bits
+            while bits:
+                low_bit = bits & -bits
+                reach |= descendants[low_bit.bit_length() - 1]
+                bits ^= low_bit
+            descendants[i] = reach
+    else:
+        for k in range(n):
+            k_bit = 1 << k
+            k_descendants = descendants[k]
+            for i in range(n):
+                if descendants[i] & k_bit:
+                    descendants[i] |= k_descendants
+    return descendants
+
+
+def reduction_bits(successor_bits: List[int], descendant_bits: List[int]) -> List[int]:
+    """
+    Transitive reduction of an acyclic graph on bitsets: an edge (i, j) is kept iff j is not reachable from another
+    successor of i. Takes O(n * E / 64) word operations.
+
+    Args:
+        successor_bits (List[int]): For every node, the bitset of its direct successors.
+        descendant_bits (List[int]): The transitive closure of successor_bits (see closure_bits).
+    """
+    reduction = []
+    for bits in successor_bits:
+        covered = 0
+        remaining = bits
+        while remaining:
+            low_bit = remaining & -remaining
+            covered |= descendant_bits[low_bit.bit_length() - 1]
+            remaining ^= low_bit
+        reduction.append(bits & ~covered)
+    return reduction
+
+
+def transitive_reduction(nodes: Iterable[Any], edges: Iterable[Tuple[Any, Any]]) -> Set[Tuple[Any, Any]]:
+    """
+    Computes the transitive reduction (Hasse diagram) of an acyclic graph with topologically ordered bitsets, in
+    O(n * E / 64) word operations.
+
+    Args:
+        nodes: The (hashable) nodes.
+        edges: The (source, target) edges.
+
+    Returns:
+        The set of edges that are not implied by transitivity.
+    """
+    nodes = list(nodes)
+    successors = {node: [] for node in nodes}
+    for s, t in edges:
+        successors[s].append(t)
+    order = topological_sort(nodes, successors)
+    if order is None:
+        raise ValueError("The transitive reduction is only defined for acyclic graphs.")
+    index = {node: i for i, node in enumerate(order)}
+    successor_bits = []
+    for node in order:
+        bits = 0
+        for successor in successors[node]:
+            bits |= 1 << index[successor]
+        successor_bits.append(bits)
+    reduction = reduction_bits(successor_bits, closure_bits(successor_bits))
+    return {(order[i], order[j]) for i, bits in enumerate(reduction) for j in iter_bits(bits)}
+
+
+def transitive_reduction_matrix(adjacency: np.ndarray) -> np.ndarray:
+    """
+    Computes the transitive reduction of an acyclic graph given as a boolean adjacency matrix whose nodes are in
+    topological order (i.e., only entries above the diagonal are set). Rows are handled as packed bit vectors, in
+    one pass in reverse topological order.
+
+    Returns:
+        Boolean matrix of the edges that are not implied by transitivity.
+    """
+    n = len(adjacency)
+    packed = np.packbits(adjacency, axis=1)
+    closure = packed.copy()
+    reduction = packed.copy()
+    for i in range(n - 1, -1, -1):
+        successors = np.flatnonzero(adjacency[i])
+        if len(successors):
+            covered = np.bitwise_or.reduce(closure[successors], axis=0)
+            closure[i] |= covered
+            reduction[i] &= ~covered
+    return np.unpackbits(reduction, axis=1, count=n).astype(bool)
+
+
+def transitive_closure_matrix(adjacency: np.ndarray) -> np.ndarray:
+    """
+    Computes the transitive closure of an acyclic graph given as a boolean adjacency matrix whose nodes are in
+    topological order, with packed rows, in one pass in reverse topological order.
+
+    Returns:
+        Boolean matrix with entry (i, j) set iff j is reachable from i by a non-empty path.
+    """
+    n = len(adjacency)
+    closure = np.packbits(adjacency, axis=1)
+    for i in range(n - 1, -1, -1):
+        successors = np.flatnonzero(adjacency[i])
+        if len(successors):
+            closure[i] |= np.bitwise_or.reduce(closure[successors], axis=0)
+    return np.unpackbits(closure, axis=1, count=n).astype(bool)
+
+
+def popcount(bits: int) -> int:
+    return bits.bit_count()
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    Yields the indices of the set bits, in increasing order.
+    """
+    while bits:
+        low_bit = bits & -bits
+        yield low_bit.bit_length() - 1
+        bits ^= low_bit
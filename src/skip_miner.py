@@ -1,15 +1,67 @@
 from collections import defaultdict
 
+import numpy as np
+
 from src.objects import Graph, VARIANT_FREQUENCY_KEY, Skip, SelfLoop
 from src.constants import TURBO
+from src.mapping import deduplicate_orders
+from src.precedence import PrecedenceSummary
+from src.variant_index import index_variants_by_node
+
+
+def group_nodes_by_support(node_to_orders: dict, sorted_keys: list, n: int) -> dict:
+    """
+    Groups the nodes by their support, i.e., the set of ids of the partial orders containing them. The nodes are
+    visited in the order of sorted_keys; a node whose support is a subset of exactly one existing group with less
+    than n orders joins that group, any other node joins (or opens) the group of its own support.
+
+    Returns:
+        Dictionary from the support (frozenset of graph ids) of every group to the list of its node ids.
+    """
+    graph_ids_lists_to_nodes = defaultdict(list)
+
+    # index of the keys of graph_ids_lists_to_nodes: key ids in insertion order, for every graph id the bitset of
+    # the keys containing it, and the bitset of the keys not covering all graphs
+    key_ids = {}
+    keys = []
+    graph_to_keys = [0] * n
+    partial_keys = 0
+
+    for node_id in sorted_keys:
+        graph_id_list = node_to_orders[node_id]
+        new_frozenset = frozenset(graph_id_list)
+
+        # the keys (with len(key) < n) that are supersets of new_frozenset
+        supersets = partial_keys
+        for graph_id in graph_id_list:
+            supersets &= graph_to_keys[graph_id]
+            if not supersets:
+                break
+        if supersets and not supersets & (supersets - 1):
+            # exactly one superset
+            last_superset = keys[supersets.bit_length() - 1]
+            graph_ids_lists_to_nodes[last_superset].append(node_id)
+        else:
+            graph_ids_lists_to_nodes[new_frozenset].append(node_id)
+            if new_frozenset not in key_ids:
+                key_bit = 1 << len(keys)
+                key_ids[new_frozenset] = len(keys)
+                keys.append(new_frozenset)
+                for graph_id in new_frozenset:
+                    graph_to_keys[graph_id] |= key_bit
+                if len(new_frozenset) < n:
+                    partial_keys |= key_bit
+    return graph_ids_lists_to_nodes
 
 
 class SkipMiner:
 
     @classmethod
-    def find_skips(cls, partial_orders):
+    def find_skips(cls, partial_orders, summary: PrecedenceSummary = None):
 
         partial_orders = list(partial_orders)
+        if summary is None:
+            summary = PrecedenceSummary(partial_orders)
         node_to_orders = defaultdict(list)
         n = len(partial_orders)
 
@@ -17,40 +69,12 @@ class SkipMiner:
         all_nodes = list({node for graph in partial_orders for node in graph.nodes})
 
 
+        node_index = index_variants_by_node(partial_orders)
         for node_id, current_node in enumerate(all_nodes):
-            for graph_id, graph in enumerate(partial_orders):
-                if current_node in graph.nodes:
-                    node_to_orders[node_id].append(graph_id)
-
-        graph_ids_lists_to_nodes = defaultdict(list)
+            node_to_orders[node_id] = node_index[current_node]
 
         sorted_keys = sorted(node_to_orders.keys(), key=lambda x: len(node_to_orders[x]), reverse=True)
-        # print(sorted_keys)
-
-        for node_id in sorted_keys:
-            graph_id_list = node_to_orders[node_id]
-        # for node_id, graph_id_list in node_to_orders.items():
-
-
-            new_frozenset = frozenset(graph_id_list)
-
-            if TURBO and False:
-                graph_ids_lists_to_nodes[new_frozenset].append(node_id)
-            else:
-                number_supersets = 0
-                for key in graph_ids_lists_to_nodes.keys():
-                    if len(key) < n and new_frozenset.issubset(key):
-                        # graph_ids_lists_to_nodes[key].append(node_id)
-                        number_supersets = number_supersets + 1
-                        last_superset = key
-                        # break
-                if number_supersets == 1:
-                    graph_ids_lists_to_nodes[last_superset].append(node_id)
-                else:
-                    # if number_supersets > 1:
-                    #     raise Exception("Too many supersets")
-                    graph_ids_lists_to_nodes[new_frozenset].append(node_id)
-
+        graph_ids_lists_to_nodes = group_nodes_by_support(node_to_orders, sorted_keys, n)
 
         res_dict = {}
         new_nodes_counter = defaultdict(int)
@@ -59,16 +83,17 @@ class SkipMiner:
                 pass
             else:
                 all_projections = []
+                group_nodes = frozenset(all_nodes[i] for i in node_id_list)
                 for graph_id in graph_id_list:
                     graph = partial_orders[graph_id]
-                    proj_nodes = [node for i, node in enumerate(all_nodes) if i in node_id_list and node in graph.nodes]
+                    proj_nodes = graph.nodes & group_nodes
                     proj_edges = [(s,t) for (s, t) in graph.edges if s in proj_nodes and t in proj_nodes]
-                    projection = Graph(frozenset(proj_nodes),
+                    projection = Graph.from_trusted(frozenset(proj_nodes),
                                        frozenset(proj_edges),
                                        {VARIANT_FREQUENCY_KEY: graph.additional_information[VARIANT_FREQUENCY_KEY]})
                     all_projections.append(projection)
                 from src.miner import _mine
-                new_graph = _mine(all_projections)
+                new_graph = _mine(deduplicate_orders(all_projections))
                 # xor = XOR(frozenset([new_graph, child_1]))
                 # new_graph.min_count = 0
 
@@ -78,12 +103,12 @@ class SkipMiner:
 
                 else:
                     remaining_nodes = [node for i, node in enumerate(all_nodes) if i not in node_id_list]
-                    remaining_proj_edges = set()
-                    for s in remaining_nodes:
-                        for t in remaining_nodes:
-                            if not any((t, s) in graph.edges for graph in partial_orders):
-                                remaining_proj_edges.add((s,t))
-                    projection = Graph(frozenset(remaining_nodes),
+                    # (s, t) such that t never precedes s in any partial order
+                    remaining_ids = [summary.node_ids[node] for node in remaining_nodes]
+                    never_before = summary.before[np.ix_(remaining_ids, remaining_ids)].T == 0
+                    remaining_proj_edges = {(remaining_nodes[i], remaining_nodes[j])
+                                            for i, j in np.argwhere(never_before).tolist()}
+                    projection = Graph.from_trusted(frozenset(remaining_nodes),
                                        frozenset(remaining_proj_edges))
                     from src.miner import apply_mining_algorithm_recursively
                     if new_graph == apply_mining_algorithm_recursively(projection):
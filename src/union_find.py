@@ -0,0 +1,90 @@
+from typing import Iterable, List, Hashable, Set
+
+
+class UnionFind:
+    """
+    Disjoint-set forest over hashable elements, with path compression and union by size.
+    Elements are added implicitly by find/union.
+    """
+
+    def __init__(self, elements: Iterable[Hashable] = ()):
+        self._parent = {}
+        self._size = {}
+        for element in elements:
+            self.add(element)
+
+    def __len__(self):
+        return len(self._parent)
+
+    def __contains__(self, element):
+        return element in self._parent
+
+    def add(self, element: Hashable):
+        if element not in self._parent:
+            self._parent[element] = element
+            self._size[element] = 1
+
+    def find(self, element: Hashable) -> Hashable:
+        """
+        Returns the representative of the set containing element.
+        """
+        parent = self._parent
+        if element not in parent:
+            self.add(element)
+            return element
+        root = element
+        while parent[root] != root:
+            root = parent[root]
+        # path compression: point every node on the path directly to the root
+        while parent[element] != root:
+            parent[element], element = root, parent[element]
+        return root
+
+    def union(self, a: Hashable, b: Hashable) -> bool:
+        """
+        Merges the sets containing a and b.
+
+        Returns:
+            True if the two sets were different (i.e., a merge happened).
+        """
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return False
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        return True
+
+    def union_all(self, elements: Iterable[Hashable]):
+        """
+        Merges the sets of all given elements into one.
+        """
+        first = None
+        for element in elements:
+            if first is None:
+                first = element
+                self.add(first)
+            else:
+                self.union(first, element)
+
+    def groups(self) -> List[list]:
+        """
+        Returns:
+            The disjoint sets as lists; sets and their elements are in the order in which the elements were added.
+        """
+        groups = {}
+        for element in self._parent:
+            groups.setdefault(self.find(element), []).append(element)
+        return list(groups.values())
+
+
+def merge_overlapping_sets(sets: Iterable[Iterable[Hashable]]) -> List[Set[Hashable]]:
+    """
+    Merges every two sets that share an element, until all resulting sets are pairwise disjoint.
+    """
+    union_find = UnionFind()
+    for s in sets:
+        union_find.union_all(s)
+    return [set(group) for group in union_find.groups()]
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.variant_encoding import ActivityAlphabet, CompactVariant, CompactVariantLog
+
+# bump whenever the layout of the cache or the encoding of CompactVariant changes
+CACHE_FORMAT_VERSION = 2
+
+_READ_BLOCK_SIZE = 1 << 20
+
+# the label types that survive the round trip through labels.json, with the tag stored next to every label
+_LABEL_TYPES = {str: "str", int: "int", float: "float", bool: "bool", type(None): "none"}
+_LABEL_DECODERS = {"str": str, "int": int, "float": float, "bool": bool, "none": lambda value: None}
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the contents of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataframe_fingerprint(df: pd.DataFrame, columns) -> str:
+    """
+    Returns a SHA-256 hex digest of the given columns of an in-memory log (row order included).
+    """
+    columns = [column for column in columns if column]
+    digest = hashlib.sha256(repr(columns).encode())
+    digest.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(source_fingerprint: str, params: dict) -> str:
+    """
+    Combines the fingerprint of the source log with the parameters of the variant extraction (e.g., the column and
+    lifecycle settings) into the name of a cache entry.
+    """
+    payload = json.dumps({"version": CACHE_FORMAT_VERSION, "source": source_fingerprint, "params": params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def supports_labels(labels) -> bool:
+    """
+    Returns True if every label is a str, int, float, bool or None, i.e., if the labels can be cached losslessly.
+    """
+    return all(type(label) in _LABEL_TYPES for label in labels)
+
+
+def encode_labels(labels) -> list:
+    """
+    Returns the labels as JSON-serializable [type tag, value] pairs.
+
+    Raises:
+        TypeError: If a label is not a str, int, float, bool or None.
+    """
+    if not supports_labels(labels):
+        unsupported = next(label for label in labels if type(label) not in _LABEL_TYPES)
+        raise TypeError(f"Cannot cache activity label {unsupported!r} of type {type(unsupported).__name__}.")
+    return [[_LABEL_TYPES[type(label)], label] for label in labels]
+
+
+def decode_labels(encoded: list) -> list:
+    return [_LABEL_DECODERS[tag](value) for tag, value in encoded]
+
+
+def save_variant_log(variant_log: CompactVariantLog, directory: str):
+    """
+    Writes a CompactVariantLog as a directory of .npy files: the interned alphabet, the variants in CSR form (the
+    concatenated node id and Hasse diagram buffers of the variants, as stored in CompactVariant, with offsets per
+    variant) and the frequencies.
+    The directory is written under a temporary name and then renamed, so readers never see a partial entry.
+
+    Raises:
+        TypeError: If an activity label cannot be cached (see supports_labels).
+    """
+    variants = list(variant_log.variants.items())
+    alphabet = variant_log.alphabet
+    labels = encode_labels(alphabet.labels)
+    node_buffers = [variant.nodes for variant, _ in variants]
+    hasse_buffers = [variant.hasse for variant, _ in variants]
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_directory = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        with open(os.path.join(tmp_directory, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump(labels, f)
+        np.save(os.path.join(tmp_directory, "node_label_ids.npy"), np.array(alphabet.node_label_ids, dtype=np.uint32))
+        np.save(os.path.join(tmp_directory, "node_numbers.npy"), np.array(alphabet.node_numbers, dtype=np.int64))
+        np.save(os.path.join(tmp_directory, "nodes.npy"), _concatenate(node_buffers))
+        np.save(os.path.join(tmp_directory, "node_offsets.npy"), _offsets(node_buffers))
+        np.save(os.path.join(tmp_directory, "hasse.npy"), _concatenate(hasse_buffers))
+        np.save(os.path.join(tmp_directory, "hasse_offsets.npy"), _offsets(hasse_buffers))
+        np.save(os.path.join(tmp_directory, "frequencies.npy"),
+                np.array([frequency for _, frequency in variants], dtype=np.int64))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp_directory, directory)
+    except BaseException:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+
+def load_variant_log(directory: str) -> CompactVariantLog:
+    """
+    Reads a CompactVariantLog written by save_variant_log. Loading is eager: every array is read into memory, and
+    every variant gets its own copy of its buffers (they are the dictionary keys of the log, so they must be
+    hashable bytes).
+    """
+    def load(name):
+        return np.load(os.path.join(directory, name))
+
+    alphabet = ActivityAlphabet()
+    with open(os.path.join(directory, "labels.json"), encoding="utf-8") as f:
+        labels = decode_labels(json.load(f))
+    for label in labels:
+        alphabet.intern_label(label)
+    for label_id, number in zip(load("node_label_ids.npy").tolist(), load("node_numbers.npy").tolist()):
+        alphabet.intern(labels[label_id], number)
+
+    nodes, node_offsets = load("nodes.npy").tobytes(), load("node_offsets.npy").tolist()
+    hasse, hasse_offsets = load("hasse.npy").tobytes(), load("hasse_offsets.npy").tolist()
+    frequencies = load("frequencies.npy").tolist()
+
+    variants = {}
+    for i, frequency in enumerate(frequencies):
+        variant = CompactVariant(nodes[node_offsets[i]:node_offsets[i + 1]], hasse[hasse_offsets[i]:hasse_offsets[i + 1]])
+        variants[variant] = frequency
+    return CompactVariantLog(alphabet, variants)
+
+
+def _concatenate(buffers) -> np.ndarray:
+    return np.frombuffer(b"".join(buffers), dtype=np.uint8)
+
+
+def _offsets(buffers) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum([len(buffer) for buffer in buffers], dtype=np.int64)))
@@ -0,0 +1,204 @@
+from typing import List, Dict, Iterable
+
+import numpy as np
+
+from src.objects import ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
+from src.reachability import topological_sort, transitive_closure_matrix, transitive_reduction_matrix
+
+
+class ActivityAlphabet:
+    """
+    Interning table that maps activity labels and activity instances (label, number) to dense integer ids.
+    Node ids are assigned in order of first appearance and are stable for the lifetime of the alphabet.
+    """
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.node_label_ids: List[int] = []
+        self.node_numbers: List[int] = []
+        self._label_ids: Dict[str, int] = {}
+        self._node_ids: Dict[tuple, int] = {}
+
+    def __len__(self):
+        return len(self.node_label_ids)
+
+    def intern_label(self, label: str) -> int:
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = len(self.labels)
+            self._label_ids[label] = label_id
+            self.labels.append(label)
+        return label_id
+
+    def intern(self, label: str, number: int) -> int:
+        key = (label, number)
+        node_id = self._node_ids.get(key)
+        if node_id is None:
+            node_id = len(self.node_label_ids)
+            self._node_ids[key] = node_id
+            self.node_label_ids.append(self.intern_label(label))
+            self.node_numbers.append(number)
+        return node_id
+
+    def intern_all(self, activities: Iterable[ActivityInstance]) -> np.ndarray:
+        """
+        Returns the node ids of a sequence of ActivityInstance objects; every distinct instance is hashed once.
+        """
+        activities = list(activities)
+        distinct = {activity: self.intern(activity.label, activity.number) for activity in set(activities)}
+        return np.fromiter((distinct[activity] for activity in activities), dtype=np.uint32, count=len(activities))
+
+    def activity(self, node_id: int) -> ActivityInstance:
+        return ActivityInstance(self.labels[self.node_label_ids[node_id]], self.node_numbers[node_id])
+
+
+class CompactVariant:
+    """
+    A variant partial order over interned node ids: the sorted node ids as a uint32 buffer and the Hasse diagram
+    (transitive reduction) of the precedence relation as a buffer of (source, target) pairs of positions in that
+    buffer, sorted lexicographically, with the smallest unsigned dtype that fits the number of nodes (see
+    position_dtype). The Hasse diagram of a partial order is unique, so both parts are canonical bytes and hashing
+    and equality run in C; for mostly sequential variants, their size is linear in the number of nodes. The
+    transitive closure is only materialized by adjacency_matrix, edges and to_graph; the miners work on Graph
+    objects with the full precedence relation, so the memory saving holds for the CompactVariantLog (e.g., with
+    compact=True or in the variant cache), not for the partial orders given to the miner.
+    """
+    __slots__ = ('nodes', 'hasse')
+
+    def __init__(self, nodes: bytes, hasse: bytes):
+        self.nodes = nodes
+        self.hasse = hasse
+
+    @classmethod
+    def from_arrays(cls, node_ids: np.ndarray, adjacency: np.ndarray):
+        """
+        Args:
+            node_ids (np.ndarray): Node ids of the events (may contain duplicates).
+            adjacency (np.ndarray): Boolean matrix with adjacency[i, j] iff event i precedes event j; the relation
+                must be acyclic and is stored up to transitivity.
+        """
+        unique_ids, inverse = np.unique(node_ids, return_inverse=True)
+        if len(unique_ids) == len(node_ids):
+            order = np.argsort(inverse)
+            matrix = adjacency[order][:, order]
+        else:
+            membership = np.zeros((len(node_ids), len(unique_ids)), dtype=np.int64)
+            membership[np.arange(len(node_ids)), inverse] = 1
+            matrix = (membership.T @ adjacency.astype(np.int64) @ membership) > 0
+        successors = {i: np.flatnonzero(row).tolist() for i, row in enumerate(matrix)}
+        topological_order = topological_sort(range(len(matrix)), successors)
+        if topological_order is None:
+            raise ValueError("The precedence relation of a variant must be acyclic.")
+        topological_order = np.array(topological_order, dtype=np.intp)
+        reduction = transitive_reduction_matrix(matrix[np.ix_(topological_order, topological_order)])
+        sources, targets = np.nonzero(reduction)
+        return cls._from_positions(unique_ids, topological_order[sources], topological_order[targets])
+
+    @classmethod
+    def from_hasse(cls, node_ids: np.ndarray, sources: np.ndarray, targets: np.ndarray):
+        """
+        Args:
+            node_ids (np.ndarray): Node ids of the events (may contain duplicates).
+            sources (np.ndarray): Event positions of the sources of the Hasse diagram edges.
+            targets (np.ndarray): Event positions of the corresponding targets.
+        """
+        unique_ids, inverse = np.unique(node_ids, return_inverse=True)
+        if len(unique_ids) < len(node_ids):
+            # merging events can make edges redundant, so the reduction is recomputed
+            adjacency = np.zeros((len(node_ids), len(node_ids)), dtype=bool)
+            adjacency[sources, targets] = True
+            return cls.from_arrays(node_ids, adjacency)
+        return cls._from_positions(unique_ids, inverse[sources], inverse[targets])
+
+    @staticmethod
+    def position_dtype(n: int):
+        if n <= 1 << 8:
+            return np.uint8
+        if n <= 1 << 16:
+            return np.uint16
+        return np.uint32
+
+    @classmethod
+    def _from_positions(cls, unique_ids: np.ndarray, sources: np.ndarray, targets: np.ndarray):
+        order = np.lexsort((targets, sources))
+        hasse = np.stack((sources[order], targets[order]), axis=1).astype(cls.position_dtype(len(unique_ids)))
+        return cls(unique_ids.astype(np.uint32).tobytes(), hasse.tobytes())
+
+    def __eq__(self, other):
+        if isinstance(other, CompactVariant):
+            return self.nodes == other.nodes and self.hasse == other.hasse
+        return False
+
+    def __hash__(self):
+        return hash((self.nodes, self.hasse))
+
+    def node_ids(self) -> np.ndarray:
+        return np.frombuffer(self.nodes, dtype=np.uint32)
+
+    def hasse_positions(self) -> np.ndarray:
+        """
+        Returns the Hasse diagram as an (E, 2) array of positions in node_ids.
+        """
+        dtype = self.position_dtype(len(self.nodes) // 4)
+        return np.frombuffer(self.hasse, dtype=dtype).reshape((-1, 2)).astype(np.intp)
+
+    def hasse_edges(self) -> np.ndarray:
+        """
+        Returns the Hasse diagram as an (E, 2) array of node ids.
+        """
+        return self.node_ids()[self.hasse_positions()]
+
+    def adjacency_matrix(self) -> np.ndarray:
+        """
+        Returns the transitive closure as a boolean matrix indexed by positions in node_ids.
+        """
+        n = len(self.nodes) // 4
+        sources, targets = self.hasse_positions().T
+        successors = {i: [] for i in range(n)}
+        for s, t in zip(sources.tolist(), targets.tolist()):
+            successors[s].append(t)
+        rank = np.empty(n, dtype=np.intp)
+        rank[topological_sort(range(n), successors)] = np.arange(n)
+        adjacency = np.zeros((n, n), dtype=bool)
+        adjacency[rank[sources], rank[targets]] = True
+        return transitive_closure_matrix(adjacency)[np.ix_(rank, rank)]
+
+    def edges(self) -> np.ndarray:
+        """
+        Returns the precedence relation (the transitive closure) as an (E, 2) array of node ids.
+        """
+        node_ids = self.node_ids()
+        sources, targets = np.nonzero(self.adjacency_matrix())
+        return np.stack((node_ids[sources], node_ids[targets]), axis=1)
+
+    def to_graph(self, alphabet: ActivityAlphabet, additional_information=None) -> Graph:
+        activities = {node_id: alphabet.activity(node_id) for node_id in self.node_ids().tolist()}
+        edges = frozenset((activities[s], activities[t]) for s, t in self.edges().tolist())
+        return Graph.from_trusted(frozenset(activities.values()), edges, additional_information, partial_order=True)
+
+
+class CompactVariantLog:
+    """
+    The distinct variants of a log in compact form, with their frequencies. Graph objects are only built on
+    demand, e.g., by to_partial_orders.
+    """
+
+    def __init__(self, alphabet: ActivityAlphabet, variants: Dict[CompactVariant, int]):
+        self.alphabet = alphabet
+        self.variants = variants
+
+    def __len__(self):
+        return len(self.variants)
+
+    def to_partial_orders(self) -> List[Graph]:
+        """
+        Returns:
+            List of Graph objects, sorted by frequency descending. Every Graph carries the transitive closure of its
+            variant, as the miners expect, so the output is as large as with the matrix encoding.
+        """
+        output_list = [variant.to_graph(self.alphabet, {VARIANT_FREQUENCY_KEY: frequency})
+                       for variant, frequency in self.variants.items()]
+        output_list.sort(
+            key=lambda x: x.additional_information[VARIANT_FREQUENCY_KEY],
+            reverse=True)
+        return output_list
@@ -0,0 +1,48 @@
+from collections import defaultdict
+from heapq import merge
+from typing import Dict, List, Any, Iterable
+
+from src.objects import Graph
+
+
+def index_variants_by_node(partial_orders: List[Graph]) -> Dict[Any, List[int]]:
+    """
+    Inverted index from each node to the ids (positions) of the partial orders containing it.
+
+    Returns:
+        Dict mapping nodes to ascending lists of partial order ids.
+    """
+    index = defaultdict(list)
+    for variant_id, graph in enumerate(partial_orders):
+        for node in graph.nodes:
+            index[node].append(variant_id)
+    return index
+
+
+def index_variants_by_label(partial_orders: List[Graph]) -> Dict[str or None, List[int]]:
+    """
+    Inverted index from each activity label to the ids (positions) of the partial orders containing it.
+    Partial orders with an unlabeled (silent) node are also indexed under None.
+
+    Returns:
+        Dict mapping labels to ascending lists of partial order ids.
+    """
+    index = defaultdict(list)
+    for variant_id, graph in enumerate(partial_orders):
+        for label in graph.labels:
+            index[label].append(variant_id)
+        if any(not node.labels for node in graph.nodes):
+            index[None].append(variant_id)
+    return index
+
+
+def variants_with_any(index: Dict[Any, List[int]], keys: Iterable) -> List[int]:
+    """
+    Returns:
+        Ascending list of the ids of the partial orders indexed under at least one of the keys.
+    """
+    res = []
+    for variant_id in merge(*(index[key] for key in keys if key in index)):
+        if not res or res[-1] != variant_id:
+            res.append(variant_id)
+    return res
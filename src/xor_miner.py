@@ -1,85 +1,97 @@
-from typing import Set
+from typing import FrozenSet, List
 
-import networkx as nx
+import numpy as np
 
 from src.objects import Graph, ActivityInstance, XOR, LOOP
 from src.log_to_partial_orders import VARIANT_FREQUENCY_KEY
-from pm4py.algo.discovery.inductive.cuts import utils as cut_util
-
-
-def get_activity(node) -> Set[str]:
-    if isinstance(node, ActivityInstance):
-        return {node.label} if node.label else set()
-    if isinstance(node, Graph):
-        children = node.nodes
-    elif isinstance(node, XOR):
-        children = node.children
-    elif isinstance(node, LOOP):
-        children = [node.body, node.redo]
-    else:
-        raise TypeError
-    res = set()
-    for child in children:
-        res.update(get_activity(child))
-    return res
+from src.mapping import deduplicate_orders
+from src.precedence import PrecedenceSummary
+from src.union_find import UnionFind
+from src.variant_index import index_variants_by_label, variants_with_any
+
+
+def get_activity(node) -> FrozenSet[str]:
+    """
+    Returns the activity labels occurring in a node; the label set is cached on the (immutable) node.
+    """
+    if isinstance(node, (ActivityInstance, Graph, XOR, LOOP)):
+        return node.labels
+    raise TypeError
+
+
+def activity_co_occurrences(partial_orders, activity_labels: List[str], weighted: bool = False) -> np.ndarray:
+    """
+    Computes how often each pair of activities occurs together in the same partial order.
+
+    Args:
+        partial_orders: List of partial orders.
+        activity_labels (List[str]): The activity labels; they define the rows and columns of the result.
+        weighted (bool): If True, each partial order counts with its variant frequency instead of once.
+
+    Returns:
+        Symmetric matrix with entry (i, j) the number of partial orders containing both activity_labels[i]
+        and activity_labels[j]; the diagonal holds the number of partial orders containing each activity.
+    """
+    label_index = {label: i for i, label in enumerate(activity_labels)}
+    order_ids = []
+    label_ids = []
+    for i, graph in enumerate(partial_orders):
+        for label in get_activity(graph):
+            order_ids.append(i)
+            label_ids.append(label_index[label])
+
+    # variant x label incidence matrix; the float product runs in BLAS
+    incidence = np.zeros((len(partial_orders), len(activity_labels)), dtype=np.float64)
+    incidence[order_ids, label_ids] = 1
+    if weighted:
+        frequencies = np.fromiter((graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
+                                   for graph in partial_orders), dtype=np.float64, count=len(partial_orders))
+        return (incidence * frequencies[:, None]).T @ incidence
+    return incidence.T @ incidence
 
 
 class XORMiner:
 
     @classmethod
-    def find_disjoint_activities(cls, partial_orders, all_activity_labels):
+    def find_disjoint_activities(cls, partial_orders, all_activity_labels, summary: PrecedenceSummary = None):
 
         """
         Finds activities that never occur together in the same partial order.
 
         :param all_activity_labels:
         :param partial_orders: List of partial orders.
+        :param summary: The precedence summary of partial_orders, if available; its co-occurrences are used instead
+            of recounting them.
         :return: Groups of disjoint activities.
         """
 
         all_activity_labels = sorted(all_activity_labels)
-        adjacency = {activity: {other_activity: 0 for other_activity in all_activity_labels} for activity in all_activity_labels}
-
-        for graph in partial_orders:
-            activity_labels_in_trace = get_activity(graph)
-            for i, activity in enumerate(activity_labels_in_trace):
-                for j, other_activity in enumerate(activity_labels_in_trace):
-                    if i != j:
-                        adjacency[activity][other_activity] += 1
-
-        found_xor = False
-        clusters = [[a] for a in all_activity_labels]
-        for i in range(len(all_activity_labels)):
-            activity = all_activity_labels[i]
-            for j in range(i + 1, len(all_activity_labels)):
-                other_activity = all_activity_labels[j]
-                if adjacency[activity][other_activity] == 0 and adjacency[other_activity][activity] == 0:
-                    found_xor = True
-                    clusters = cut_util.merge_lists_based_on_activities(activity, other_activity, clusters)
+        if summary is not None:
+            adjacency = summary.label_co_occurrences(all_activity_labels)
+        else:
+            adjacency = activity_co_occurrences(partial_orders, all_activity_labels)
+
+        # pairs (i < j) of activities that never occur together, in row-major order
+        disjoint_pairs = np.argwhere(np.triu(adjacency == 0, k=1))
+        found_xor = len(disjoint_pairs) > 0
 
         if found_xor:
+            clusters = UnionFind(range(len(all_activity_labels)))
+            for i, j in disjoint_pairs.tolist():
+                clusters.union(i, j)
             res = []
-            for cluster in clusters:
+            for cluster in clusters.groups():
                 if len(cluster) == 1:
-                    # res_dict[cluster[0]] = cluster[0]
                     pass
                 else:
-                    from itertools import combinations
-                    nx_graph = nx.DiGraph()
-                    nx_graph.add_nodes_from(cluster)
-                    # print(adjacency)
-                    for a, b in combinations(cluster, 2):
-                        if adjacency[a][b] > 0 and adjacency[b][a] > 0:
-                            nx_graph.add_edge(a, b)
-                    nx_und = nx_graph.to_undirected()
-                    conn_comps = [nx_und.subgraph(c).copy() for c in nx.connected_components(nx_und)]
+                    # connected components of the activities of the cluster that do occur together
+                    components = UnionFind(cluster)
+                    co_occurring = np.argwhere(np.triu(adjacency[np.ix_(cluster, cluster)] > 0, k=1))
+                    for a, b in co_occurring.tolist():
+                        components.union(cluster[a], cluster[b])
+                    conn_comps = components.groups()
                     if len(conn_comps) > 1:
-                        cuts = list()
-                        for comp in conn_comps:
-                            cuts.append(set(comp.nodes))
-                        # children = [cls.project_partial_orders_on_groups(partial_orders, list(cut)) for cut in cuts]
-                        # model = OperatorPOWL(Operator.XOR, children=children)
-                        # res_dict[tuple(sorted(cluster))] = model
+                        cuts = [{all_activity_labels[i] for i in comp} for comp in conn_comps]
                         res.append(cuts)
                     else:
                         return None
@@ -88,24 +100,29 @@ class XORMiner:
             return None
 
     @classmethod
-    def project_partial_orders_on_groups(cls, partial_orders, group):
+    def project_partial_orders_on_groups(cls, partial_orders, group, label_index=None):
+        """
+        Projects the partial orders on the nodes whose activities all belong to group; empty projections are dropped.
+
+        Args:
+            partial_orders: List of partial orders.
+            group: Activity labels to project on.
+            label_index: Inverted label index of partial_orders (see index_variants_by_label); built if not given.
+                Only the partial orders indexed under a label of the group (or under None) are visited.
+        """
+        if label_index is None:
+            label_index = index_variants_by_label(partial_orders)
         res = []
-        for graph in partial_orders:
+        for graph_id in variants_with_any(label_index, list(group) + [None]):
+            graph = partial_orders[graph_id]
             new_nodes = frozenset([n for n in graph.nodes if get_activity(n).issubset(group)])
             if len(new_nodes) == 0:
                 continue
             new_edges = frozenset([(s, t) for (s, t) in graph.edges if s in new_nodes and t in new_nodes])
-            new_graph = Graph(new_nodes, new_edges)
-            found = False
-            # for other_graph in res:
-            #     if other_graph == new_graph:
-            #         found = True
-            #         other_graph.additional_information[VARIANT_FREQUENCY_KEY] = other_graph.additional_information[VARIANT_FREQUENCY_KEY] + graph.additional_information[VARIANT_FREQUENCY_KEY]
-            #         break
-            if not found:
-                new_graph.additional_information = {VARIANT_FREQUENCY_KEY: graph.additional_information[VARIANT_FREQUENCY_KEY]}
-                res.append(new_graph)
-        return res
+            new_graph = Graph.from_trusted(new_nodes, new_edges,
+                                           {VARIANT_FREQUENCY_KEY: graph.additional_information[VARIANT_FREQUENCY_KEY]})
+            res.append(new_graph)
+        return deduplicate_orders(res)
 
     # @classmethod
     # def has_empty_traces(cls, partial_orders, cluster):
@@ -127,7 +144,7 @@ class XORMiner:
         for graph in orders:
             new_nodes = set()
             for node in graph.nodes:
-                label = get_activity(node).pop()
+                label = next(iter(get_activity(node)))
                 if label in label_mapping.keys():
                     new_nodes.add(label_mapping[node.label])
                 else:
@@ -143,32 +160,20 @@ class XORMiner:
                         edges_set.remove((s, t))
                         edges_set.remove((t, s))
 
-            new_graph = Graph(frozenset(new_nodes), frozenset(edges_set), graph.additional_information)
-
-            found_po = False
-            # for other_graph in res:
-            #     if other_graph == new_graph:
-            #         other_graph.additional_information[VARIANT_FREQUENCY_KEY] = other_graph.additional_information[
-            #                                                                      VARIANT_FREQUENCY_KEY] + \
-            #                                                                  graph.additional_information[
-            #                                                                      VARIANT_FREQUENCY_KEY]
-            #         found_po = True
-            #         break
-
-            if not found_po:
-                res.append(new_graph)
-        return res
+            new_graph = Graph.from_trusted(frozenset(new_nodes), frozenset(edges_set), graph.additional_information)
+            res.append(new_graph)
+        return deduplicate_orders(res)
 
     @classmethod
     def __add_edge(cls, node, other_node, label_mapping, edges_set):
-        label = get_activity(node).pop()
+        label = next(iter(get_activity(node)))
         if label in label_mapping.keys():
             source = label_mapping[label]
         else:
             source = node
         other_labels = get_activity(other_node)
         if other_labels.issubset(label_mapping.keys()):
-            target = label_mapping[other_labels.pop()]
+            target = label_mapping[next(iter(other_labels))]
         else:
             target = other_node
         if source != target:
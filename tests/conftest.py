@@ -0,0 +1,55 @@
+import glob
+import os
+import sys
+
+import pm4py
+import pytest
+
+# the modules are imported as src.<module>, relative to the repository root
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+from src.log_to_partial_orders import transform_log_to_partially_ordered_variants  # noqa: E402
+from src.objects import Graph, VARIANT_FREQUENCY_KEY  # noqa: E402
+
+TEST_LOGS = sorted(glob.glob(os.path.join(REPOSITORY_ROOT, "test_logs", "*.xes")))
+
+
+@pytest.fixture(scope="session", params=TEST_LOGS, ids=os.path.basename)
+def log_path(request):
+    """
+    The path of every bundled test log.
+    """
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def log(log_path):
+    """
+    Every bundled test log, parsed once per session; tests must not modify it.
+    """
+    return pm4py.read_xes(log_path)
+
+
+@pytest.fixture(scope="session")
+def partial_orders(log):
+    """
+    The partial orders of every bundled test log, with the default parameters.
+    """
+    return transform_log_to_partially_ordered_variants(log)
+
+
+def total_order(*nodes, frequency=1, extra_nodes=(), extra_edges=()):
+    """
+    Returns the transitively closed chain nodes[0] -> nodes[1] -> ..., plus the given extra nodes and edges.
+    """
+    edges = {(nodes[i], nodes[j]) for i in range(len(nodes)) for j in range(i + 1, len(nodes))}
+    return Graph(frozenset(nodes) | frozenset(extra_nodes), frozenset(edges | set(extra_edges)),
+                 {VARIANT_FREQUENCY_KEY: frequency})
+
+
+def summary(partial_orders):
+    """
+    The (repr, frequency) pairs of a list of partial orders, in their order; used to compare two lists of them.
+    """
+    return [(repr(graph), graph.additional_information[VARIANT_FREQUENCY_KEY]) for graph in partial_orders]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.combine_order import _combine_orders_bitsets, _combine_orders_numpy, combine_orders
+from src.objects import ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
+from src.precedence import PrecedenceSummary
+from src.xor_miner import XORMiner, get_activity
+
+
+def reference_combine_orders(orders):
+    """
+    Combines the orders pair by pair: the union of the edges is closed transitively, then every edge that
+    contradicts an order (both nodes occur without the edge) is removed, and so is every edge (j, k) with i -> j and
+    (i, k) in conflict.
+    """
+    nodes = sorted({x for g in orders for x in g.nodes})
+    edges = {(u, v) for g in orders for (u, v) in g.edges}
+    conflicts = {(u, u) for u in nodes} | {(u, v) for g in orders for u in g.nodes for v in g.nodes
+                                           if (u, v) not in g.edges}
+    for k in nodes:
+        for i in nodes:
+            if (i, k) in edges:
+                edges |= {(i, j) for j in nodes if (k, j) in edges}
+    edges -= conflicts
+    for i in nodes:
+        for k in nodes:
+            if (i, k) in conflicts:
+                edges -= {(j, k) for j in nodes if (i, j) in edges}
+    return Graph(frozenset(nodes), frozenset(edges))
+
+
+def random_orders(rng, n_labels, n_orders):
+    labels = [ActivityInstance(chr(ord("A") + i), 1) for i in range(n_labels)]
+    orders = []
+    for _ in range(n_orders):
+        nodes = [label for label in labels if rng.random() < 0.8]
+        rng.shuffle(nodes)
+        edges = {(nodes[i], nodes[j]) for i in range(len(nodes)) for j in range(i + 1, len(nodes))
+                 if rng.random() < 0.7}
+        closure = set(edges)
+        for k in nodes:
+            closure |= {(i, j) for (i, k1) in closure if k1 == k for (k2, j) in closure if k2 == k}
+        orders.append(Graph(frozenset(nodes), frozenset(closure), {VARIANT_FREQUENCY_KEY: int(rng.integers(1, 5))}))
+    return orders
+
+
+def assert_backends_match_reference(orders):
+    expected = reference_combine_orders(orders)
+    nodes = sorted({x for g in orders for x in g.nodes})
+    for actual in (_combine_orders_bitsets(orders, nodes), _combine_orders_numpy(PrecedenceSummary(orders)),
+                   combine_orders(orders)):
+        assert actual.nodes == expected.nodes
+        assert actual.edges == expected.edges
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_combine_orders_matches_reference_on_random_orders(seed):
+    rng = np.random.default_rng(seed)
+    assert_backends_match_reference(random_orders(rng, int(rng.integers(1, 12)), int(rng.integers(1, 8))))
+
+
+def test_combine_orders_matches_reference_on_test_logs(partial_orders):
+    assert_backends_match_reference(partial_orders)
+
+    labels = {label for g in partial_orders for label in get_activity(g)}
+    for cluster in XORMiner.find_disjoint_activities(partial_orders, labels) or []:
+        for group in cluster:
+            assert_backends_match_reference(XORMiner.project_partial_orders_on_groups(partial_orders, list(group)))
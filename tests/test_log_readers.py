@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from src.log_readers import (_parse_timestamps, read_csv_chunks, read_log_chunks, read_parquet_chunks,
+                             read_xes_chunks)
+from src.log_to_partial_orders import transform_chunks_to_partially_ordered_variants
+
+from conftest import summary
+
+CASE_ID_COL = "case:concept:name"
+CHUNK_SIZES = (100, 1001)
+
+
+def events_of_finished_traces(chunk):
+    """
+    The number of events of a chunk without its last trace, which may continue in the next chunk.
+    """
+    return int((chunk[CASE_ID_COL] != chunk[CASE_ID_COL].iloc[-1]).sum())
+
+
+def assert_matches_batch(chunks, log, partial_orders):
+    chunks = list(chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(log)
+    assert pd.concat(chunks)[CASE_ID_COL].tolist() == log[CASE_ID_COL].tolist()
+    assert summary(transform_chunks_to_partially_ordered_variants(chunks)) == summary(partial_orders)
+    return chunks
+
+
+@pytest.fixture
+def csv_path(log, tmp_path):
+    path = tmp_path / "log.csv"
+    log.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def parquet_path(log, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "log.parquet"
+    log.to_parquet(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_read_xes_chunks(log_path, log, partial_orders, chunk_size):
+    chunks = assert_matches_batch(read_xes_chunks(log_path, chunk_size), log, partial_orders)
+    # a chunk is yielded as soon as it holds chunk_size events of complete traces
+    assert all(events_of_finished_traces(chunk) < chunk_size for chunk in chunks)
+    assert all(chunk["time:timestamp"].dt.tz is not None for chunk in chunks)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_read_csv_chunks(csv_path, log, partial_orders, chunk_size):
+    chunks = assert_matches_batch(read_csv_chunks(csv_path, chunk_size, dtype={CASE_ID_COL: str}), log,
+                                  partial_orders)
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+    assert all(pd.api.types.is_datetime64_any_dtype(chunk["time:timestamp"]) for chunk in chunks)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_read_parquet_chunks(parquet_path, log, partial_orders, chunk_size):
+    chunks = assert_matches_batch(read_parquet_chunks(parquet_path, chunk_size), log, partial_orders)
+    assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+
+def test_read_log_chunks_dispatches_on_the_extension(log_path, csv_path, parquet_path, log, partial_orders):
+    assert_matches_batch(read_log_chunks(log_path, 1001), log, partial_orders)
+    assert_matches_batch(read_log_chunks(csv_path, 1001, dtype={CASE_ID_COL: str}), log, partial_orders)
+    assert_matches_batch(read_log_chunks(parquet_path, 1001), log, partial_orders)
+    with pytest.raises(ValueError, match="Unsupported log format"):
+        read_log_chunks(log_path + ".json")
+
+
+def test_parse_timestamps():
+    chunk = pd.DataFrame({"time:timestamp": ["2015-01-05T09:00:07+01:00", "2015-01-05 09:00:08+00:00"],
+                          "other": ["2015-01-05T09:00:07", "2015-01-05T09:00:08"]})
+    parsed = _parse_timestamps(chunk, "time:timestamp")
+
+    assert parsed["time:timestamp"].tolist() == [pd.Timestamp("2015-01-05T08:00:07", tz="UTC"),
+                                                 pd.Timestamp("2015-01-05T09:00:08", tz="UTC")]
+    # only the ordering column is parsed, and already parsed or missing columns are left as they are
+    assert parsed["other"].dtype == object
+    assert _parse_timestamps(parsed, "time:timestamp") is parsed
+    assert _parse_timestamps(parsed, "missing")["other"].dtype == object
+    assert _parse_timestamps(parsed, None) is parsed
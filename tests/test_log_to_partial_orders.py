@@ -0,0 +1,145 @@
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.log_to_partial_orders import (generate_interval_df_fifo, transform_log_to_partially_ordered_variants,
+                                       transform_chunks_to_partially_ordered_variants)
+from src.objects import VARIANT_FREQUENCY_KEY
+
+from conftest import summary
+
+
+def chunked(df, chunk_size):
+    return (df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size))
+
+
+@pytest.mark.parametrize("lifecycle_col", ["lifecycle:transition", None])
+def test_streaming_matches_batch(log, lifecycle_col):
+    expected = summary(transform_log_to_partially_ordered_variants(log, lifecycle_col=lifecycle_col))
+    # chunk sizes that split cases at the chunk boundaries, and a single chunk
+    for chunk_size in (100, 1001, len(log)):
+        streamed = transform_chunks_to_partially_ordered_variants(chunked(log, chunk_size), lifecycle_col=lifecycle_col)
+        assert summary(streamed) == expected, chunk_size
+
+
+def test_parallel_grouping_matches_sequential(log):
+    expected = summary(transform_log_to_partially_ordered_variants(log, n_jobs=1))
+    for n_jobs in (2, -1):
+        assert summary(transform_log_to_partially_ordered_variants(log, n_jobs=n_jobs)) == expected, n_jobs
+
+
+@pytest.mark.parametrize("n_jobs", [0, -2, -8])
+def test_invalid_n_jobs(n_jobs):
+    with pytest.raises(ValueError, match="n_jobs"):
+        transform_log_to_partially_ordered_variants(None, n_jobs=n_jobs)
+
+
+def test_streaming_rejects_non_contiguous_cases(log):
+    case_ids = log["case:concept:name"].drop_duplicates().tolist()
+    if len(case_ids) < 2:
+        pytest.skip("needs two cases")
+    first_case = log[log["case:concept:name"] == case_ids[0]]
+    second_case = log[log["case:concept:name"] == case_ids[1]]
+    # the first case is completed by the second one and then continues
+    chunks = [first_case.iloc[:1], second_case, first_case.iloc[1:] if len(first_case) > 1 else first_case]
+
+    with pytest.raises(ValueError, match="not contiguous"):
+        transform_chunks_to_partially_ordered_variants(chunks, validate_contiguity=True)
+    # without validation, the two parts of the first case are processed as two cases
+    assert transform_chunks_to_partially_ordered_variants(chunks)
+
+
+def reference_intervals(df, case_id_col, activity_col, ordering_col, lifecycle_col, lifecycle_instance_col=None):
+    """
+    FIFO interval pairing with one queue of start timestamps per (activity, instance), event by event; returns the
+    sorted (case, label, instance number, start, end) tuples.
+    """
+    df = df.sort_values([case_id_col, ordering_col])
+    columns = [activity_col, ordering_col, lifecycle_col or activity_col, lifecycle_instance_col or activity_col]
+    intervals = []
+    for case_id, trace in df.groupby(case_id_col, sort=False):
+        queues, numbers = {}, Counter()
+        for activity, timestamp, transition, instance in trace[columns].itertuples(index=False):
+            key = (activity, instance if lifecycle_instance_col else None)
+            transition = transition.lower() if lifecycle_col else "complete"
+            if lifecycle_col and transition == "start":
+                queues.setdefault(key, deque()).append(timestamp)
+            elif transition == "complete":
+                start = queues[key].popleft() if queues.get(key) else timestamp
+                numbers[activity] += 1
+                intervals.append((case_id, activity, numbers[activity], pd.Timestamp(start), pd.Timestamp(timestamp)))
+    return sorted(intervals)
+
+
+def reference_variants(intervals):
+    """
+    Per case, the activity instances and every pair (a, b) such that b starts strictly after a ends; returns the
+    frequency of every (nodes, edges) variant.
+    """
+    cases = {}
+    for case_id, label, number, start, end in intervals:
+        cases.setdefault(case_id, []).append(((label, number), start, end))
+    return Counter((frozenset(a for a, _, _ in events),
+                    frozenset((a, b) for a, _, end in events for b, start, _ in events if start > end))
+                   for events in cases.values())
+
+
+def as_tuples(interval_df, case_id_col):
+    return sorted(zip(interval_df[case_id_col], (a.label for a in interval_df["activity"]),
+                      (a.number for a in interval_df["activity"]), interval_df["start_timestamp"],
+                      interval_df["end_timestamp"]))
+
+
+def random_log(seed, n_cases=200):
+    """
+    A log with overlapping instances of the same activity, starts without completes, completes without starts and
+    lifecycle instance ids; the timestamps are distinct.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for case in range(n_cases):
+        for _ in range(rng.integers(1, 12)):
+            rows.append((f"c{case}", "ABC"[rng.integers(3)], ["start", "complete", "COMPLETE"][rng.integers(3)],
+                         f"i{rng.integers(2)}"))
+    timestamps = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(rng.permutation(len(rows)), unit="s")
+    df = pd.DataFrame(rows, columns=["case:concept:name", "concept:name", "lifecycle:transition", "instance"])
+    df["time:timestamp"] = timestamps
+    return df.sample(frac=1, random_state=seed)
+
+
+@pytest.mark.parametrize("lifecycle_col", ["lifecycle:transition", None])
+def test_fifo_intervals_match_reference(log, lifecycle_col):
+    interval_df = generate_interval_df_fifo(log, "case:concept:name", "concept:name", "time:timestamp",
+                                            lifecycle_col, "start", "complete", None)
+    expected = reference_intervals(log, "case:concept:name", "concept:name", "time:timestamp", lifecycle_col)
+    assert as_tuples(interval_df, "case:concept:name") == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("lifecycle_instance_col", ["instance", None])
+def test_fifo_intervals_match_reference_on_random_logs(seed, lifecycle_instance_col):
+    df = random_log(seed)
+    interval_df = generate_interval_df_fifo(df, "case:concept:name", "concept:name", "time:timestamp",
+                                            "lifecycle:transition", "start", "complete", lifecycle_instance_col)
+    expected = reference_intervals(df, "case:concept:name", "concept:name", "time:timestamp", "lifecycle:transition",
+                                   lifecycle_instance_col)
+    assert as_tuples(interval_df, "case:concept:name") == expected
+
+
+@pytest.mark.parametrize("lifecycle_col", ["lifecycle:transition", None])
+def test_variants_match_reference(log, lifecycle_col):
+    expected = reference_variants(reference_intervals(log, "case:concept:name", "concept:name", "time:timestamp",
+                                                      lifecycle_col))
+
+    for compact in (False, True):
+        variants = transform_log_to_partially_ordered_variants(log, lifecycle_col=lifecycle_col, compact=compact)
+        if compact:
+            variants = variants.to_partial_orders()
+        actual = Counter()
+        for graph in variants:
+            key = (frozenset((a.label, a.number) for a in graph.nodes),
+                   frozenset(((s.label, s.number), (t.label, t.number)) for s, t in graph.edges))
+            actual[key] += graph.additional_information[VARIANT_FREQUENCY_KEY]
+        assert actual == expected
@@ -0,0 +1,37 @@
+from src.loop_miner import LoopMiner
+from src.objects import LOOP, ActivityInstance, Graph
+
+from conftest import total_order
+
+A1, A2, A3 = (ActivityInstance("A", number) for number in (1, 2, 3))
+B1, B2, B3 = (ActivityInstance("B", number) for number in (1, 2, 3))
+S1, E1 = ActivityInstance("S", 1), ActivityInstance("E", 1)
+
+
+def test_loop_signature_ignores_the_instance_numbers():
+    first = Graph(frozenset([A1, B1, A2]), frozenset([(A1, B1), (B1, A2), (A1, A2)]))
+    second = Graph(frozenset([A3, B2, A1]), frozenset([(A3, B2), (B2, A1), (A3, A1)]))
+
+    assert LoopMiner.loop_signature(first) == LoopMiner.loop_signature(second)
+    assert LoopMiner.loop_signature(A2) == LoopMiner.loop_signature(A3) == "A"
+
+
+def test_loop_signature_depends_on_the_label_edges():
+    forward = Graph(frozenset([A1, B1]), frozenset([(A1, B1)]))
+    backward = Graph(frozenset([A2, B3]), frozenset([(B3, A2)]))
+    concurrent = Graph(frozenset([A1, B1]), frozenset())
+
+    signatures = {LoopMiner.loop_signature(graph) for graph in (forward, backward, concurrent)}
+    assert len(signatures) == 3
+    assert LoopMiner.loop_signature(Graph(frozenset([A1]), frozenset())) != LoopMiner.loop_signature(A1)
+
+
+def test_find_loops_shares_the_loop_of_equivalent_bodies():
+    graph = total_order(S1, A1, B1, A2, B2, A3, E1)
+
+    mapping, loops_frequencies = LoopMiner.find_loops(graph)
+
+    # both repetitions of A -> B map onto one loop, keyed by label
+    assert set(mapping) == {"A", "B"}
+    assert isinstance(mapping["A"], LOOP) and mapping["A"] is mapping["B"]
+    assert dict(loops_frequencies) == {mapping["A"]: 2}
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from src.loop_miner_scc import LoopMinerBetween
+from src.objects import LOOP, ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
+
+LABELS = ["A", "B", "C", "D", "E", "F"]
+
+
+def reference_dfg(graph, labels):
+    """
+    The weighted DFG of the instances with the given labels, pair by pair: (s, t) counts unless t precedes s.
+    """
+    dfg_freq = defaultdict(int)
+    succ, pred = defaultdict(set), defaultdict(set)
+    nodes = [n for n in graph.nodes if isinstance(n, ActivityInstance) and n.label in labels]
+    for s in nodes:
+        for t in nodes:
+            if t not in graph.predecessors[s]:
+                dfg_freq[(s.label, t.label)] += graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
+                succ[s.label].add(t.label)
+                pred[t.label].add(s.label)
+    return dfg_freq, succ, pred
+
+
+def reference_check_loop_cut(succ, pred, A_start, A_end, A1, A2):
+    if any(b in A2 and a not in A_end for a in A1 for b in succ[a]):
+        return False
+    if any(a in A1 and a not in A_start for b in A2 for a in succ[b]):
+        return False
+    if any(x != y and (y in succ[x] or x in succ[y]) for x in A2 for y in A2):
+        return False
+    for b in A2:
+        preds = {p for p in pred[b] if p in A_end}
+        if preds and preds != A_end:
+            return False
+        succs = {s for s in succ[b] if s in A_start}
+        if succs and succs != A_start:
+            return False
+    return True
+
+
+def reference_mine_on_labels(graph, labels, global_start, global_end):
+    """
+    Rebuilds the DFG of the active labels in every round and peels the label with the highest frequency (ties go to
+    the first label in sorted order).
+    """
+    active = set(labels)
+    while len(active) >= 2:
+        dfg_freq, succ, pred = reference_dfg(graph, active)
+        A_start, A_end = active & global_start, active & global_end
+        A1 = A_start | A_end
+        A2 = active - A1
+        if A2 and reference_check_loop_cut(succ, pred, A_start, A_end, A1, A2):
+            frequency = graph.additional_information.get(VARIANT_FREQUENCY_KEY, 1)
+            parts = []
+            for part in (A1, A2):
+                nodes = {n for n in graph.nodes if isinstance(n, ActivityInstance) and n.label in part}
+                parts.append(Graph(frozenset(nodes), frozenset((s, t) for s, t in graph.edges
+                                                               if s in nodes and t in nodes),
+                                   {VARIANT_FREQUENCY_KEY: frequency}))
+            loop_node = LOOP(body=parts[0], redo=parts[1])
+            mapping = {n: loop_node if isinstance(n, ActivityInstance) and n.label in A2 else n for n in graph.nodes}
+            return mapping, {loop_node: sum(w for (u, v), w in dfg_freq.items() if u in A2 and v in A1)}
+        freq_by_label = defaultdict(int)
+        for (u, v), w in dfg_freq.items():
+            freq_by_label[u] += w
+            freq_by_label[v] += w
+        if "Repair (Complex)" in freq_by_label:
+            drop = "Repair (Complex)"
+        else:
+            drop = max(sorted(freq_by_label), key=lambda label: freq_by_label[label])
+        active.remove(drop)
+    return {}, {}
+
+
+def random_graph(rng):
+    """
+    A random partial order over a few instances of some labels, with a random frequency.
+    """
+    nodes = []
+    for label in LABELS[:int(rng.integers(2, len(LABELS) + 1))]:
+        nodes += [ActivityInstance(label, number) for number in range(1, int(rng.integers(1, 4)))]
+    rng.shuffle(nodes)
+    n = len(nodes)
+    adjacency = np.triu(rng.random((n, n)) < rng.random(), k=1)
+    for k in range(n):
+        adjacency[adjacency[:, k]] |= adjacency[k]
+    edges = {(nodes[i], nodes[j]) for i, j in np.argwhere(adjacency).tolist()}
+    return Graph(frozenset(nodes), frozenset(edges), {VARIANT_FREQUENCY_KEY: int(rng.integers(1, 4))})
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_dfg_matrix_and_loop_cut_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    graph = random_graph(rng)
+    labels = sorted({n.label for n in graph.nodes})
+    dfg_freq, succ, pred = reference_dfg(graph, set(labels))
+
+    matrix = LoopMinerBetween._build_dfg_matrix(graph, labels)
+    assert {(labels[i], labels[j]): int(matrix[i, j]) for i, j in np.argwhere(matrix > 0).tolist()} == dict(dfg_freq)
+
+    def mask(subset):
+        return np.array([label in subset for label in labels], dtype=bool)
+
+    for _ in range(10):
+        A_start = {label for label in labels if rng.random() < 0.3}
+        A_end = {label for label in labels if rng.random() < 0.3}
+        A1 = A_start | A_end
+        A2 = set(labels) - A1
+        assert LoopMinerBetween._check_loop_cut(matrix > 0, mask(A_start), mask(A_end), mask(A1), mask(A2)) == \
+            reference_check_loop_cut(succ, pred, A_start, A_end, A1, A2)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_mine_on_labels_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    graph = random_graph(rng)
+    labels = {n.label for n in graph.nodes}
+    global_start = {label for label in labels if rng.random() < 0.3}
+    global_end = {label for label in labels if rng.random() < 0.3}
+
+    assert LoopMinerBetween._mine_on_labels(graph, labels, global_start, global_end) == \
+        reference_mine_on_labels(graph, labels, global_start, global_end)
@@ -0,0 +1,33 @@
+from src.loop_miner_start_end import LoopMinerStartEnd, shortcut_free_adjacency
+from src.objects import LOOP, ActivityInstance
+
+from conftest import total_order
+
+
+S1, E1 = ActivityInstance("S", 1), ActivityInstance("E", 1)
+A1, A2, A3 = ActivityInstance("A", 1), ActivityInstance("A", 2), ActivityInstance("A", 3)
+B1, B2 = ActivityInstance("B", 1), ActivityInstance("B", 2)
+X1, Y1 = ActivityInstance("X", 1), ActivityInstance("Y", 1)
+SEQUENCE = [S1, A1, B1, A2, B2, A3, E1]
+
+
+def test_shortcut_free_adjacency_is_the_transitive_reduction_of_acyclic_graphs():
+    graph = total_order(*SEQUENCE)
+    succ, pred = shortcut_free_adjacency(graph)
+    reduction = graph.transitive_reduction
+    assert succ == {n: set(targets) for n, targets in reduction.successors.items()}
+    assert pred == {n: set(sources) for n, sources in reduction.predecessors.items()}
+
+
+def test_find_loops_on_cyclic_graph():
+    # X and Y precede each other, as after mapping two interleaved nodes onto one loop
+    extra = {(X1, Y1), (Y1, X1)} | {(n, x) for n in SEQUENCE for x in (X1, Y1)}
+    graph = total_order(*SEQUENCE, extra_nodes=[X1, Y1], extra_edges=extra)
+    assert not graph.is_acyclic
+
+    mapping, frequencies = LoopMinerStartEnd.find_loops(graph)
+
+    assert set(mapping) == {"A", "B"}
+    assert isinstance(mapping["A"], LOOP) and mapping["A"] is mapping["B"]
+    result = LoopMinerStartEnd.apply_mapping(graph, mapping, frequencies)
+    assert result.nodes == {S1, E1, X1, Y1, mapping["A"]}
@@ -0,0 +1,137 @@
+import pytest
+
+from src import loop_strategies
+from src.loop_miner_scc import LoopMinerBetween
+from src.loop_strategies import (AUTO, LOOP_STRATEGIES, GraphStatistics, LoopMiningRecord, mine_loops,
+                                 rank_strategies, register_loop_strategy, summarize_loop_mining)
+from src.objects import LOOP, ActivityInstance, VARIANT_FREQUENCY_KEY
+
+from conftest import total_order
+
+
+S1, E1 = ActivityInstance("S", 1), ActivityInstance("E", 1)
+A1, A2, A3 = ActivityInstance("A", 1), ActivityInstance("A", 2), ActivityInstance("A", 3)
+B1, B2 = ActivityInstance("B", 1), ActivityInstance("B", 2)
+LOOPING = total_order(S1, A1, B1, A2, B2, A3, E1, frequency=3)
+
+
+class FixedCostMiner:
+    """
+    A miner stub with the find_loops/apply_mapping contract that records its calls and optionally raises.
+    """
+
+    def __init__(self, name, calls, error=None):
+        self.name = name
+        self.calls = calls
+        self.error = error
+
+    def find_loops(self, graph):
+        self.calls.append(self.name)
+        if self.error is not None:
+            raise self.error
+        return {}, {}
+
+    def apply_mapping(self, graph, mapping, loops_frequencies):
+        return graph
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """
+    An empty strategy registry and record list for the duration of a test.
+    """
+    monkeypatch.setattr(loop_strategies, "LOOP_STRATEGIES", {})
+    monkeypatch.setattr(loop_strategies, "loop_mining_records", [])
+    return loop_strategies
+
+
+@pytest.mark.parametrize("name", sorted(LOOP_STRATEGIES))
+def test_registered_strategy_replaces_repeated_instances_by_a_loop(name):
+    result = LOOP_STRATEGIES[name].apply(LOOPING)
+
+    loops = [n for n in result.nodes if isinstance(n, LOOP)]
+    assert len(loops) == 1
+    assert loops[0].labels == {"A", "B"}
+    assert {n for n in result.nodes if isinstance(n, ActivityInstance)} == {S1, E1}
+    assert result.edges == {(S1, loops[0]), (loops[0], E1), (S1, E1)}
+    assert result.additional_information[VARIANT_FREQUENCY_KEY] == 3
+
+
+@pytest.mark.parametrize("name", sorted(LOOP_STRATEGIES))
+def test_registered_strategy_keeps_graphs_without_repetitions(name):
+    graph = total_order(S1, A1, B1, E1)
+    assert mine_loops(graph, name) is graph
+
+
+def test_between_finds_no_loop_on_a_partial_order():
+    # the reason why LoopMinerBetween is not registered as a strategy
+    assert "between" not in LOOP_STRATEGIES
+    mapping, loops_frequencies = LoopMinerBetween.find_loops(LOOPING)
+    assert all(node is target for node, target in mapping.items()) and not loops_frequencies
+
+
+def test_between_apply_mapping_applies_node_mapping():
+    loop = LOOP(body=A1, redo=B1)
+    mapping = {A1: loop, B1: loop, A2: loop, B2: loop, A3: loop}
+
+    result = LoopMinerBetween.apply_mapping(LOOPING, mapping, {loop: 3})
+
+    assert result.nodes == {S1, loop, E1}
+    assert result.edges == {(S1, loop), (loop, E1), (S1, E1)}
+
+
+def test_graph_statistics():
+    statistics = GraphStatistics(LOOPING)
+    assert (statistics.nodes, statistics.edges, statistics.labels) == (7, 21, 4)
+    assert (statistics.repeated_labels, statistics.repeated_instances) == (2, 5)
+    assert statistics.density == 0.5
+
+
+def test_rank_strategies_orders_by_estimated_cost(registry):
+    calls = []
+    register_loop_strategy("expensive", FixedCostMiner("expensive", calls), lambda st: 100)
+    register_loop_strategy("cheap", FixedCostMiner("cheap", calls), lambda st: 1)
+    register_loop_strategy("medium", FixedCostMiner("medium", calls), lambda st: st.nodes)
+
+    assert [s.name for s in rank_strategies(GraphStatistics(LOOPING))] == ["cheap", "medium", "expensive"]
+
+
+def test_auto_falls_back_in_cost_order_on_recoverable_errors(registry):
+    calls = []
+    register_loop_strategy("first", FixedCostMiner("first", calls, ValueError("no loop cut")), lambda st: 1)
+    register_loop_strategy("third", FixedCostMiner("third", calls), lambda st: 3)
+    register_loop_strategy("second", FixedCostMiner("second", calls), lambda st: 2)
+
+    assert mine_loops(LOOPING, AUTO) is LOOPING
+    assert calls == ["first", "second"]
+    assert [(r.strategy, r.succeeded) for r in registry.loop_mining_records] == [("first", False), ("second", True)]
+    runs, failures, seconds = summarize_loop_mining()["first"]
+    assert (runs, failures) == (1, 1) and seconds >= 0
+
+
+def test_auto_raises_if_all_strategies_fail(registry):
+    calls = []
+    register_loop_strategy("only", FixedCostMiner("only", calls, ValueError("cyclic")), lambda st: 1)
+
+    with pytest.raises(ValueError, match="cyclic"):
+        mine_loops(LOOPING, AUTO)
+
+
+def test_auto_propagates_unexpected_errors(registry):
+    calls = []
+    register_loop_strategy("broken", FixedCostMiner("broken", calls, KeyError("bug")), lambda st: 1)
+    register_loop_strategy("fallback", FixedCostMiner("fallback", calls), lambda st: 2)
+
+    with pytest.raises(KeyError):
+        mine_loops(LOOPING, AUTO)
+    assert calls == ["broken"]
+
+
+def test_unknown_strategy(registry):
+    with pytest.raises(ValueError, match="Unknown loop mining strategy"):
+        mine_loops(LOOPING, "nope")
+
+
+def test_loop_mining_record_repr():
+    record = LoopMiningRecord("instances", 0.5, GraphStatistics(LOOPING), False)
+    assert repr(record).startswith("LoopMiningRecord(instances, 0.5000s, failed, GraphStatistics(nodes=7")
@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from src.mapping import deduplicate_orders, quotient_edges
+from src.objects import ActivityInstance, Graph, VARIANT_FREQUENCY_KEY
+
+from conftest import total_order
+
+A, B, C, D = (ActivityInstance(label, 1) for label in "ABCD")
+
+
+def reference_quotient_edges(graph, mapping, new_nodes):
+    """
+    Checks every pair of nodes of every pair of new nodes.
+    """
+    reverse_mapping = defaultdict(set)
+    for node, new_node in mapping.items():
+        reverse_mapping[new_node].add(node)
+    return {(s, t) for s in new_nodes for t in new_nodes
+            if s != t and all((u, v) in graph.edges for u in reverse_mapping[s] for v in reverse_mapping[t])}
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_quotient_edges_matches_reference_on_random_mappings(seed):
+    rng = np.random.default_rng(seed)
+    nodes = [ActivityInstance(f"quotient_{i}", 1) for i in range(int(rng.integers(1, 9)))]
+    # a random partial order: a random subset of the pairs of a random total order, transitively closed
+    order = [nodes[i] for i in rng.permutation(len(nodes))]
+    edges = {(order[i], order[j]) for i in range(len(order)) for j in range(i + 1, len(order)) if rng.random() < 0.6}
+    for k in order:
+        edges |= {(u, w) for u, v in edges if v == k for v2, w in edges if v2 == k}
+    graph = Graph(frozenset(nodes), frozenset(edges))
+    # some new nodes have no preimage
+    new_nodes = [f"block_{b}" for b in range(int(rng.integers(1, len(nodes) + 2)))]
+    mapping = {node: new_nodes[int(rng.integers(len(new_nodes)))] for node in nodes}
+    reverse_mapping = defaultdict(set)
+    for node, new_node in mapping.items():
+        reverse_mapping[new_node].add(node)
+
+    result = quotient_edges(graph, reverse_mapping, new_nodes)
+
+    assert result == reference_quotient_edges(graph, mapping, new_nodes)
+    # every quotient edge between two non-empty blocks is the image of an edge of the graph
+    assert {(s, t) for s, t in result if reverse_mapping[s] and reverse_mapping[t]} <= \
+        {(mapping[s], mapping[t]) for s, t in graph.edges if mapping[s] != mapping[t]}
+
+
+def test_quotient_edges_requires_all_pairs_of_the_blocks():
+    # A -> B -> C and A -> D; {B, D} precedes C only partially
+    graph = total_order(A, B, C, extra_nodes=[D], extra_edges=[(A, D)])
+    reverse_mapping = {"a": {A}, "bd": {B, D}, "c": {C}}
+
+    assert quotient_edges(graph, reverse_mapping, ["a", "bd", "c"]) == {("a", "bd"), ("a", "c")}
+
+
+def test_deduplicate_orders_merges_equal_orders():
+    orders = [total_order(A, B, frequency=2), total_order(B, A, frequency=3), total_order(A, B, frequency=4),
+              total_order(C), total_order(B, A)]
+
+    result = deduplicate_orders(orders)
+
+    # the first occurrence of every order keeps its position and gets the summed frequency
+    assert result == [total_order(A, B), total_order(B, A), total_order(C)]
+    assert [graph.additional_information[VARIANT_FREQUENCY_KEY] for graph in result] == [6, 4, 1]
+    # the input orders are not modified
+    assert [graph.additional_information[VARIANT_FREQUENCY_KEY] for graph in orders] == [2, 3, 4, 1, 1]
+
+
+def test_deduplicate_orders_keeps_the_other_information():
+    first = Graph(frozenset([A]), frozenset(), {VARIANT_FREQUENCY_KEY: 2, "source": "first"})
+    second = Graph(frozenset([A]), frozenset(), {"source": "second"})
+
+    (merged,) = deduplicate_orders([first, second])
+
+    # orders without a frequency count once
+    assert merged.additional_information == {VARIANT_FREQUENCY_KEY: 3, "source": "first"}
+
+
+def test_deduplicate_orders_without_duplicates_returns_the_orders():
+    orders = [total_order(A, B), total_order(B, A, frequency=2), total_order(A, B, C)]
+    result = deduplicate_orders(orders)
+
+    assert result == orders and result is not orders
+    assert all(new is old for new, old in zip(result, orders))
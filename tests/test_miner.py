@@ -0,0 +1,50 @@
+import pytest
+
+from src import miner
+from src.miner import MiningCache, _mine
+from src.objects import ActivityInstance, VARIANT_FREQUENCY_KEY
+
+from conftest import total_order
+
+A, B, C = (ActivityInstance(label, 1) for label in "ABC")
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    miner.mining_cache.clear()
+    yield
+    miner.mining_cache.clear()
+
+
+def test_fingerprint_ignores_the_order_of_the_list():
+    orders = [total_order(A, B), total_order(B, A, frequency=2)]
+    assert MiningCache.fingerprint(orders) == MiningCache.fingerprint(orders[::-1])
+
+
+def test_fingerprint_depends_on_frequencies():
+    assert MiningCache.fingerprint([total_order(A, B)]) != \
+        MiningCache.fingerprint([total_order(A, B, frequency=2)])
+    assert MiningCache.fingerprint([total_order(A, B), total_order(B, A)]) != \
+        MiningCache.fingerprint([total_order(A, B), total_order(A, B), total_order(B, A)])
+
+
+def test_single_order_keeps_its_own_frequency():
+    first = _mine([total_order(A, B, C, frequency=1)])
+    second = _mine([total_order(A, B, C, frequency=5)])
+
+    assert first.additional_information[VARIANT_FREQUENCY_KEY] == 1
+    assert second.additional_information[VARIANT_FREQUENCY_KEY] == 5
+
+
+def test_hits_return_copies():
+    orders = [total_order(A, B, C, frequency=3)]
+    model = _mine(orders)
+    model.additional_information["mutated"] = True
+
+    hit = _mine(orders)
+
+    assert miner.mining_cache.hits == 1
+    assert hit == model and hit is not model
+    assert hit.additional_information == {VARIANT_FREQUENCY_KEY: 3}
+    hit.additional_information["mutated"] = True
+    assert _mine(orders).additional_information == {VARIANT_FREQUENCY_KEY: 3}
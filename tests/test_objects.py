@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+
+from src import objects
+from src.objects import XOR, LOOP, Skip, SelfLoop, ActivityInstance, Graph
+
+
+def test_equal_nodes_of_different_classes_are_interned_separately():
+    a, tau = ActivityInstance("interned_a", 1), ActivityInstance(None, 1)
+
+    over_skip = XOR(frozenset([Skip.create(a)]))
+    over_xor = XOR(frozenset([XOR(frozenset([a, tau]))]))
+
+    # structural equality ignores the class, the interned instances keep it
+    assert over_skip == over_xor
+    assert over_skip is not over_xor
+    assert type(next(iter(over_skip.children))) is Skip
+    assert type(next(iter(over_xor.children))) is XOR
+
+
+def test_interning_keeps_the_class_in_both_construction_orders():
+    a, tau = ActivityInstance("interned_b", 1), ActivityInstance(None, 1)
+
+    over_xor = XOR(frozenset([XOR(frozenset([a, tau]))]))
+    over_skip = XOR(frozenset([Skip.create(a)]))
+    assert type(next(iter(over_xor.children))) is XOR
+    assert type(next(iter(over_skip.children))) is Skip
+
+    # one level further down, through a graph body
+    loop_over_xor = LOOP(Graph(frozenset([XOR(frozenset([a, tau]))]), frozenset()), tau)
+    loop_over_skip = LOOP(Graph(frozenset([Skip.create(a)]), frozenset()), tau)
+    assert type(next(iter(loop_over_xor.body.nodes))) is XOR
+    assert type(next(iter(loop_over_skip.body.nodes))) is Skip
+
+
+def test_interning_shares_identical_nodes():
+    a, b = ActivityInstance("interned_c", 1), ActivityInstance("interned_d", 1)
+
+    assert ActivityInstance("interned_c", 1) is a
+    assert XOR(frozenset([a, b])) is XOR(frozenset([b, a]))
+    assert LOOP(a, b) is LOOP(a, b)
+    assert Skip.create(a) is Skip.create(a)
+    assert SelfLoop(a) is SelfLoop(a)
+    assert LOOP(a, b) is not SelfLoop(a)
+
+
+def test_unpickled_nodes_are_interned():
+    a, tau = ActivityInstance("interned_e", 1), ActivityInstance(None, 1)
+    skip = Skip.create(a)
+    xor = XOR(frozenset([a, tau]))
+
+    assert pickle.loads(pickle.dumps(skip)) is skip
+    assert pickle.loads(pickle.dumps(xor)) is xor
+
+
+def test_from_trusted_equals_the_validated_graph():
+    a, b, c = (ActivityInstance(label, 1) for label in ("trusted_a", "trusted_b", "trusted_c"))
+    nodes, edges = frozenset([a, b, c]), frozenset([(a, b), (b, c), (a, c)])
+
+    trusted = Graph.from_trusted(nodes, edges, {"key": 1}, partial_order=True)
+    validated = Graph(nodes, edges, {"key": 1})
+
+    assert type(trusted) is Graph
+    assert trusted == validated and hash(trusted) == hash(validated)
+    assert trusted.additional_information == validated.additional_information
+    assert trusted.transitive_reduction == validated.transitive_reduction
+
+
+def test_from_trusted_validates_in_debug_mode(monkeypatch):
+    a, b, c = (ActivityInstance(label, 1) for label in ("trusted_d", "trusted_e", "trusted_f"))
+    nodes = frozenset([a, b, c])
+    cyclic = frozenset([(a, b), (b, a), (a, a), (b, b)])
+    not_transitive = frozenset([(a, b), (b, c)])
+    outside = frozenset([(a, ActivityInstance("trusted_g", 1))])
+
+    # without VALIDATE_GRAPHS, nothing is checked
+    assert Graph.from_trusted(nodes, outside, partial_order=True).edges == outside
+
+    monkeypatch.setattr(objects, "VALIDATE_GRAPHS", True)
+    with pytest.raises(ValueError, match="acyclic"):
+        Graph.from_trusted(nodes, cyclic, partial_order=True)
+    with pytest.raises(ValueError, match="transitively closed"):
+        Graph.from_trusted(nodes, not_transitive, partial_order=True)
+    with pytest.raises(ValueError, match="not in the node set"):
+        Graph.from_trusted(nodes, outside)
+    with pytest.raises(TypeError):
+        Graph.from_trusted(set(nodes), not_transitive)
+    # intermediate graphs of the mining need not be partial orders
+    assert Graph.from_trusted(nodes, cyclic) == Graph(nodes, cyclic)
+    assert Graph.from_trusted(nodes, not_transitive) == Graph(nodes, not_transitive)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.objects import VARIANT_FREQUENCY_KEY
+from src.precedence import PrecedenceSummary
+from src.xor_miner import XORMiner, activity_co_occurrences, get_activity
+
+
+def test_matrices_match_a_scan_of_the_orders(partial_orders):
+    summary = PrecedenceSummary(partial_orders)
+    for u in summary.nodes:
+        for v in summary.nodes:
+            both = [g for g in partial_orders if u in g.nodes and v in g.nodes]
+            weight = sum(g.additional_information[VARIANT_FREQUENCY_KEY] for g in both)
+            before = sum(g.additional_information[VARIANT_FREQUENCY_KEY] for g in both if (u, v) in g.edges)
+            i, j = summary.node_ids[u], summary.node_ids[v]
+            assert summary.co_occurrences[i, j] == weight
+            assert summary.before[i, j] == before
+            assert summary.precedes(u, v) == any((u, v) in g.edges for g in partial_orders)
+
+
+def test_label_co_occurrences_match_activity_co_occurrences(partial_orders):
+    labels = sorted({label for g in partial_orders for label in get_activity(g)})
+    expected = activity_co_occurrences(partial_orders, labels) > 0
+    assert np.array_equal(PrecedenceSummary(partial_orders).label_co_occurrences(labels) > 0, expected)
+
+
+def test_find_disjoint_activities_with_summary(partial_orders):
+    labels = {label for g in partial_orders for label in get_activity(g)}
+    expected = XORMiner.find_disjoint_activities(partial_orders, labels)
+    assert XORMiner.find_disjoint_activities(partial_orders, labels, PrecedenceSummary(partial_orders)) == expected
+
+    # the same on every projection of the log on an XOR branch
+    for cluster in expected or []:
+        for group in cluster:
+            projected = XORMiner.project_partial_orders_on_groups(partial_orders, list(group))
+            group_labels = {label for g in projected for label in get_activity(g)}
+            assert XORMiner.find_disjoint_activities(projected, group_labels, PrecedenceSummary(projected)) == \
+                XORMiner.find_disjoint_activities(projected, group_labels)
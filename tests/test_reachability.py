@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from src.objects import ActivityInstance, Graph
+from src.reachability import (closure_bits, iter_bits, popcount, reduction_bits, topological_sort,
+                              transitive_closure_matrix, transitive_reduction, transitive_reduction_matrix)
+
+
+def naive_closure(adjacency):
+    closure = adjacency.copy()
+    for k in range(len(closure)):
+        for i in range(len(closure)):
+            if closure[i, k]:
+                closure[i] |= closure[k]
+    return closure
+
+
+def naive_reduction(adjacency):
+    closure = naive_closure(adjacency)
+    n = len(adjacency)
+    return np.array([[adjacency[i, j] and not any(closure[i, k] and closure[k, j] for k in range(n))
+                      for j in range(n)] for i in range(n)], dtype=bool).reshape((n, n))
+
+
+def to_bits(matrix):
+    return [sum(1 << j for j in np.flatnonzero(row).tolist()) for row in matrix]
+
+
+def from_bits(bits, n):
+    return np.array([[bool(b >> j & 1) for j in range(n)] for b in bits], dtype=bool).reshape((n, n))
+
+
+def random_dag(rng, n, density):
+    """
+    A random DAG whose nodes are in topological order.
+    """
+    return np.triu(rng.random((n, n)) < density, k=1)
+
+
+CASES = [(0, 0.5), (1, 0.5), (5, 0.5), (20, 0.1), (20, 0.5), (70, 0.05)]
+
+
+@pytest.mark.parametrize("n, density", CASES)
+def test_closure_and_reduction_match_reference(n, density):
+    rng = np.random.default_rng(n)
+    for _ in range(10):
+        adjacency = random_dag(rng, n, density)
+        closure, reduction = naive_closure(adjacency), naive_reduction(adjacency)
+
+        descendant_bits = closure_bits(to_bits(adjacency))
+        assert np.array_equal(from_bits(descendant_bits, n), closure)
+        assert np.array_equal(from_bits(closure_bits(to_bits(adjacency), acyclic=False), n), closure)
+        assert np.array_equal(from_bits(reduction_bits(to_bits(adjacency), descendant_bits), n), reduction)
+        assert np.array_equal(transitive_closure_matrix(adjacency), closure)
+        assert np.array_equal(transitive_reduction_matrix(adjacency), reduction)
+
+
+@pytest.mark.parametrize("n, density", CASES)
+def test_relabeled_graphs_match_reference(n, density):
+    rng = np.random.default_rng(n)
+    for _ in range(10):
+        adjacency = random_dag(rng, n, density)
+        nodes = [ActivityInstance(f"a{i}", 1) for i in rng.permutation(n).tolist()]
+        edges = {(nodes[i], nodes[j]) for i, j in np.argwhere(adjacency).tolist()}
+        closure = {(nodes[i], nodes[j]) for i, j in np.argwhere(naive_closure(adjacency)).tolist()}
+        reduction = {(nodes[i], nodes[j]) for i, j in np.argwhere(naive_reduction(adjacency)).tolist()}
+
+        assert transitive_reduction(nodes[::-1], edges) == reduction
+        graph = Graph(frozenset(nodes), frozenset(closure))
+        assert graph.is_acyclic
+        assert graph.transitive_reduction.edges == reduction
+        assert Graph(frozenset(nodes), frozenset(edges)).transitive_reduction.edges == reduction
+
+
+def test_cyclic_graphs():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = 8
+        adjacency = rng.random((n, n)) < 0.2
+        closure = naive_closure(adjacency)
+        assert np.array_equal(from_bits(closure_bits(to_bits(adjacency), acyclic=False), n), closure)
+        order = topological_sort(range(n), {i: np.flatnonzero(adjacency[i]).tolist() for i in range(n)})
+        if closure.diagonal().any():
+            assert order is None
+        else:
+            position = {node: i for i, node in enumerate(order)}
+            assert all(position[i] < position[j] for i, j in np.argwhere(adjacency).tolist())
+
+
+def test_popcount_and_iter_bits():
+    for bits in (0, 1, 0b1011, (1 << 200) | (1 << 64) | 7):
+        assert popcount(bits) == bin(bits).count("1")
+        assert list(iter_bits(bits)) == [i for i in range(bits.bit_length()) if bits >> i & 1]
@@ -0,0 +1,48 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from src.skip_miner import group_nodes_by_support
+from src.variant_index import index_variants_by_node
+
+
+def reference_group_nodes_by_support(node_to_orders, sorted_keys, n):
+    """
+    Scans all existing groups for supersets of the support of every node.
+    """
+    groups = defaultdict(list)
+    for node_id in sorted_keys:
+        support = frozenset(node_to_orders[node_id])
+        supersets = [key for key in groups if len(key) < n and support.issubset(key)]
+        groups[supersets[0] if len(supersets) == 1 else support].append(node_id)
+    return groups
+
+
+def assert_matches_reference(node_to_orders, n):
+    sorted_keys = sorted(node_to_orders, key=lambda x: len(node_to_orders[x]), reverse=True)
+    expected = reference_group_nodes_by_support(node_to_orders, sorted_keys, n)
+    # the insertion order of the groups is the order in which find_skips builds the skip nodes
+    assert list(group_nodes_by_support(node_to_orders, sorted_keys, n).items()) == list(expected.items())
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_group_nodes_by_support_matches_reference_on_random_supports(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 8))
+    # few distinct supports, so that subsets, supersets and repeated supports are common
+    supports = [sorted(rng.choice(n, size=int(rng.integers(1, n + 1)), replace=False).tolist())
+                for _ in range(int(rng.integers(1, 5)))]
+    node_to_orders = {node_id: supports[int(rng.integers(len(supports)))] if rng.random() < 0.7
+                      else sorted(rng.choice(n, size=int(rng.integers(1, n + 1)), replace=False).tolist())
+                      for node_id in range(int(rng.integers(1, 15)))}
+    assert_matches_reference(node_to_orders, n)
+
+
+def test_group_nodes_by_support_matches_reference_on_test_logs(partial_orders):
+    all_nodes = list({node for graph in partial_orders for node in graph.nodes})
+    node_index = index_variants_by_node(partial_orders)
+    node_to_orders = {node_id: node_index[node] for node_id, node in enumerate(all_nodes)}
+    assert node_to_orders == {node_id: [graph_id for graph_id, graph in enumerate(partial_orders) if node in graph.nodes]
+                              for node_id, node in enumerate(all_nodes)}
+    assert_matches_reference(node_to_orders, len(partial_orders))
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import numpy as np
+import pm4py
+import pytest
+
+from src import log_to_partial_orders, variant_cache
+from src.log_to_partial_orders import transform_log_to_partially_ordered_variants
+from src.objects import VARIANT_FREQUENCY_KEY
+from src.variant_encoding import ActivityAlphabet, CompactVariant, CompactVariantLog
+
+from conftest import TEST_LOGS
+
+TEST_LOG = TEST_LOGS[0]
+
+
+def summary(variant_log):
+    return ([(repr(graph), graph.additional_information[VARIANT_FREQUENCY_KEY])
+             for graph in variant_log.to_partial_orders()],
+            variant_log.alphabet.labels, variant_log.variants)
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if not name.startswith("."))
+
+
+@pytest.mark.parametrize("source", ["path", "dataframe"])
+def test_miss_save_hit(tmp_path, monkeypatch, source):
+    cache_dir = str(tmp_path / "cache")
+    log = TEST_LOG if source == "path" else pm4py.read_xes(TEST_LOG)
+    expected = transform_log_to_partially_ordered_variants(log, compact=True)
+
+    miss = transform_log_to_partially_ordered_variants(log, compact=True, cache_dir=cache_dir)
+    assert len(entries(cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the log was processed on a cache hit")
+    monkeypatch.setattr(log_to_partial_orders, "generate_interval_df_fifo", fail)
+    hit = transform_log_to_partially_ordered_variants(log, compact=True, cache_dir=cache_dir)
+
+    assert summary(miss) == summary(expected)
+    assert summary(hit) == summary(expected)
+
+
+def test_changed_source_invalidates_the_key(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = str(tmp_path / "log.xes")
+    shutil.copyfile(TEST_LOG, path)
+    params = dict(activity_col="concept:name")
+    key = variant_cache.cache_key(variant_cache.file_fingerprint(path), params)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert variant_cache.cache_key(variant_cache.file_fingerprint(path), params) != key
+    assert variant_cache.cache_key(variant_cache.file_fingerprint(TEST_LOG), dict(activity_col="other")) != \
+        variant_cache.cache_key(variant_cache.file_fingerprint(TEST_LOG), params)
+
+    log = pm4py.read_xes(TEST_LOG)
+    columns = ["case:concept:name", "concept:name"]
+    fingerprint = variant_cache.dataframe_fingerprint(log, columns)
+    changed = log.copy()
+    changed.loc[changed.index[0], "concept:name"] = "changed"
+    assert variant_cache.dataframe_fingerprint(changed, columns) != fingerprint
+
+    transform_log_to_partially_ordered_variants(path, cache_dir=cache_dir)
+    transform_log_to_partially_ordered_variants(TEST_LOG, cache_dir=cache_dir)
+    assert len(entries(cache_dir)) == 2
+
+
+def test_labels_keep_their_type(tmp_path):
+    alphabet = ActivityAlphabet()
+    labels = ["1", 2, 2.5, True, None]
+    node_ids = np.array([alphabet.intern(label, 1) for label in labels], dtype=np.uint32)
+    positions = np.arange(len(labels))
+    variant = CompactVariant.from_hasse(node_ids, positions[:-1], positions[1:])
+    variant_log = CompactVariantLog(alphabet, {variant: 2})
+
+    variant_cache.save_variant_log(variant_log, str(tmp_path / "entry"))
+    loaded = variant_cache.load_variant_log(str(tmp_path / "entry"))
+
+    assert [(type(label), label) for label in loaded.alphabet.labels] == [(type(label), label) for label in labels]
+    assert loaded.variants == {variant: 2}
+
+
+def test_unsupported_labels_are_not_cached(tmp_path):
+    alphabet = ActivityAlphabet()
+    alphabet.intern(("a", "b"), 1)
+    assert not variant_cache.supports_labels(alphabet.labels)
+    with pytest.raises(TypeError, match="Cannot cache activity label"):
+        variant_cache.save_variant_log(CompactVariantLog(alphabet, {}), str(tmp_path / "entry"))
+    assert not os.path.exists(tmp_path / "entry")
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.objects import ActivityInstance
+from src.variant_encoding import ActivityAlphabet, CompactVariant
+
+
+def random_partial_order(rng, n, density):
+    """
+    Returns the transitive closure of a random DAG on n events, as a boolean matrix in a random event order.
+    """
+    adjacency = np.triu(rng.random((n, n)) < density, k=1)
+    permutation = rng.permutation(n)
+    return naive_closure(adjacency[np.ix_(permutation, permutation)])
+
+
+def naive_closure(adjacency):
+    closure = adjacency.copy()
+    for k in range(len(closure)):
+        closure |= closure[:, [k]] & closure[[k], :]
+    return closure
+
+
+def naive_reduction(closure):
+    implied = (closure.astype(np.int64) @ closure.astype(np.int64)) > 0
+    return closure & ~implied
+
+
+@pytest.mark.parametrize("n, density", [(1, 0.0), (2, 1.0), (8, 0.3), (30, 0.1), (30, 0.6), (300, 0.01)])
+def test_from_hasse_round_trips_to_the_closure(n, density):
+    rng = np.random.default_rng(n)
+    for _ in range(20 if n < 300 else 2):
+        closure = random_partial_order(rng, n, density)
+        node_ids = rng.permutation(3 * n)[:n].astype(np.uint32)
+        sources, targets = np.nonzero(naive_reduction(closure))
+
+        variant = CompactVariant.from_hasse(node_ids, sources, targets)
+
+        assert variant == CompactVariant.from_arrays(node_ids, closure)
+        order = np.argsort(node_ids)
+        assert np.array_equal(variant.node_ids(), node_ids[order])
+        assert np.array_equal(variant.adjacency_matrix(), closure[np.ix_(order, order)])
+        assert {tuple(edge) for edge in variant.edges().tolist()} == \
+            {(node_ids[s], node_ids[t]) for s, t in zip(*np.nonzero(closure))}
+        assert {tuple(edge) for edge in variant.hasse_edges().tolist()} == \
+            {(node_ids[s], node_ids[t]) for s, t in zip(sources.tolist(), targets.tolist())}
+
+
+def test_to_graph_carries_the_closure():
+    alphabet = ActivityAlphabet()
+    node_ids = np.array([alphabet.intern(label, 1) for label in "ABCD"], dtype=np.uint32)
+    # A -> B -> D and A -> C -> D
+    variant = CompactVariant.from_hasse(node_ids, np.array([0, 0, 1, 2]), np.array([1, 2, 3, 3]))
+
+    graph = variant.to_graph(alphabet)
+
+    a, b, c, d = (ActivityInstance(label, 1) for label in "ABCD")
+    assert graph.nodes == {a, b, c, d}
+    assert graph.edges == {(a, b), (a, c), (b, d), (c, d), (a, d)}
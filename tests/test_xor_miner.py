@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src.objects import ActivityInstance, Graph
+from src.xor_miner import XORMiner, get_activity
+
+
+def reference_disjoint_activities(partial_orders, all_activity_labels):
+    """
+    Merges the clusters of every pair of activities that never occur together, then splits every cluster into the
+    connected components of its activities that do occur together; returns the sorted components of the clusters
+    with more than one activity, or None if there is no such cluster or one of them is connected.
+    """
+    labels = sorted(all_activity_labels)
+    together = {(a, b) for g in partial_orders for a in get_activity(g) for b in get_activity(g) if a != b}
+
+    clusters = [{a} for a in labels]
+    found_xor = False
+    for i, a in enumerate(labels):
+        for b in labels[i + 1:]:
+            if (a, b) not in together:
+                found_xor = True
+                cluster_a = next(c for c in clusters if a in c)
+                cluster_b = next(c for c in clusters if b in c)
+                if cluster_a is not cluster_b:
+                    clusters.remove(cluster_b)
+                    cluster_a |= cluster_b
+    if not found_xor:
+        return None
+
+    res = []
+    for cluster in clusters:
+        if len(cluster) == 1:
+            continue
+        components = []
+        unvisited = set(cluster)
+        while unvisited:
+            stack = [unvisited.pop()]
+            component = set(stack)
+            while stack:
+                a = stack.pop()
+                for b in [b for b in unvisited if (a, b) in together]:
+                    unvisited.remove(b)
+                    component.add(b)
+                    stack.append(b)
+            components.append(component)
+        if len(components) == 1:
+            return None
+        res.append(components)
+    return normalized(res)
+
+
+def normalized(clusters):
+    if clusters is None:
+        return None
+    return sorted(sorted(sorted(group) for group in cluster) for cluster in clusters)
+
+
+def assert_matches_reference(orders):
+    labels = {label for g in orders for label in get_activity(g)}
+    assert normalized(XORMiner.find_disjoint_activities(orders, labels)) == \
+        reference_disjoint_activities(orders, labels)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_find_disjoint_activities_matches_reference_on_random_logs(seed):
+    rng = np.random.default_rng(seed)
+    labels = [chr(ord("A") + i) for i in range(int(rng.integers(2, 10)))]
+    # every order picks one label of each block, plus a few random labels, so that XORs exist but may be broken
+    blocks = np.array_split(rng.permutation(labels), int(rng.integers(1, len(labels) + 1)))
+    orders = []
+    for _ in range(int(rng.integers(1, 10))):
+        chosen = {str(rng.choice(block)) for block in blocks} | {label for label in labels if rng.random() < 0.1}
+        orders.append(Graph(frozenset(ActivityInstance(label, 1) for label in chosen), frozenset()))
+    assert_matches_reference(orders)
+
+
+def test_find_disjoint_activities_matches_reference_on_test_logs(partial_orders):
+    pending = [partial_orders]
+    while pending:
+        orders = pending.pop()
+        assert_matches_reference(orders)
+        labels = {label for g in orders for label in get_activity(g)}
+        for cluster in XORMiner.find_disjoint_activities(orders, labels) or []:
+            for group in cluster:
+                pending.append(XORMiner.project_partial_orders_on_groups(orders, list(group)))